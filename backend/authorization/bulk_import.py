@@ -0,0 +1,226 @@
+"""Bulk user provisioning from CSV or NDJSON.
+
+Rows are validated with the UserImport model and upserted on email in chunks,
+one multi-row INSERT ... ON CONFLICT DO UPDATE per chunk, each in its own
+transaction. A chunk the database rejects is split in halves and retried,
+so only the offending lines are reported. Existing users keep their status; unchanged rows are not
+touched. Used by POST /api/users/import and from the command line:
+
+    python -m backend.authorization.bulk_import employees.csv
+
+The CLI can only clear the caches of its own process. Running servers pick
+up changed profiles after PROFILE_CACHE_TTL_SEC and changed roles on the
+next /refresh after REFRESH_CACHE_TTL_SEC; use the endpoint when a role
+change has to apply immediately.
+"""
+
+from sqlalchemy import func, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from pydantic import ValidationError
+from typing import AsyncIterator
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import time
+
+from backend.authorization.database.database import Users, new_session
+from backend.authorization.models import UserImport
+from backend.authorization.profile_cache import profile_cache
+from backend.authorization.refresh_tokens import refresh_token_store
+from backend.authorization.config import settings
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# overwritten on existing users; status is only set for new ones
+UPDATE_FIELDS = ("name", "surname", "patronymic", "phone", "telegram_link", "post", "team", "role")
+
+async def _read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    buffer = b""
+    first = True
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+            first = False
+    if buffer:
+        yield buffer.decode("utf-8-sig" if first else "utf-8").rstrip("\r")
+
+async def _csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | str]]:
+    # A record may span lines inside a quoted field; it is complete once the
+    # quotes seen so far balance, doubled quotes included.
+    header = None
+    record = []
+    start = 0
+    line_no = 0
+    async for line in _read_lines(chunks):
+        line_no += 1
+        if not record:
+            start = line_no
+        record.append(line)
+        if sum(part.count('"') for part in record) % 2:
+            continue
+
+        text = "\n".join(record)
+        record = []
+        if not text.strip():
+            continue
+
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # empty cells mean "not set", so optional fields fall back to None
+        yield start, {name: value for name, value in zip(header, values) if value != ""}
+
+    if record:
+        yield start, "Unterminated quoted field"
+
+async def _ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | str]]:
+    line_no = 0
+    async for line in _read_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, "Expected a JSON object"
+            continue
+        yield line_no, row
+
+async def _upsert_chunk(rows: list[tuple[int, UserImport]]) -> tuple[int, int]:
+    insert_users = pg_insert(Users).values([
+        {**user.model_dump(), "email": user.email.strip()}
+        for _, user in rows
+    ])
+    excluded = insert_users.excluded
+    stmt = (
+        insert_users
+        .on_conflict_do_update(
+            index_elements=[Users.email],
+            set_={
+                **{field: getattr(excluded, field) for field in UPDATE_FIELDS},
+                "version": Users.version + 1,
+                # onupdate defaults are not applied to ON CONFLICT DO UPDATE
+                "updated_at": func.now(),
+            },
+            # re-importing the same file leaves the rows and their versions alone
+            where=tuple_(*(getattr(Users, field) for field in UPDATE_FIELDS)).is_distinct_from(
+                tuple_(*(getattr(excluded, field) for field in UPDATE_FIELDS))
+            ),
+        )
+        # xmax is 0 only for a freshly inserted row version
+        .returning(Users.id, literal_column("xmax = 0").label("inserted"))
+    )
+
+    async with new_session() as session:
+        async with session.begin():
+            result = (await session.execute(stmt)).all()
+
+    updated_ids = [row.id for row in result if not row.inserted]
+    for user_id in updated_ids:
+        profile_cache.invalidate(user_id)
+        refresh_token_store.invalidate_user(user_id)
+    return len(result) - len(updated_ids), len(updated_ids)
+
+# a chunk binds 11 parameters per row and asyncpg allows 32767 per statement,
+# so USER_IMPORT_CHUNK_SIZE has to stay below ~2900
+async def import_users(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    chunk_size: int = settings.USER_IMPORT_CHUNK_SIZE,
+    max_errors: int = settings.USER_IMPORT_MAX_ERRORS,
+) -> dict:
+    start = time.perf_counter()
+    report = {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "failed": 0, "errors": []}
+
+    def fail(line: int, error, email: str | None = None, count: int = 1):
+        report["failed"] += count
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"line": line, "email": email, "error": error})
+
+    # emails are unique per statement: ON CONFLICT cannot touch a row twice
+    pending: dict[str, tuple[int, UserImport]] = {}
+
+    async def upsert(rows: list[tuple[int, UserImport]]):
+        # each attempt is its own transaction, so a rejected chunk left
+        # nothing behind and its halves can be retried on their own
+        try:
+            inserted, updated = await _upsert_chunk(rows)
+        except SQLAlchemyError as e:
+            if len(rows) > 1:
+                middle = len(rows) // 2
+                await upsert(rows[:middle])
+                await upsert(rows[middle:])
+                return
+            line, user = rows[0]
+            logger.error(f"User import of line {line} failed: {e}")
+            fail(line, "Database error", user.email)
+            return
+        report["inserted"] += inserted
+        report["updated"] += updated
+        report["unchanged"] += len(rows) - inserted - updated
+
+    async def flush():
+        rows = list(pending.values())
+        pending.clear()
+        await upsert(rows)
+
+    records = _csv_records(chunks) if fmt == "csv" else _ndjson_records(chunks)
+    async for line, row in records:
+        report["rows"] += 1
+        if isinstance(row, str):
+            fail(line, row)
+            continue
+        try:
+            user = UserImport.model_validate(row)
+        except ValidationError as e:
+            fail(line, e.errors(include_url=False, include_context=False, include_input=False), row.get("email"))
+            continue
+
+        email = user.email.strip()
+        if email in pending:
+            previous = pending.pop(email)[0]
+            fail(previous, f"Superseded by line {line} with the same email", email)
+        pending[email] = (line, user)
+
+        if len(pending) >= chunk_size:
+            await flush()
+
+    if pending:
+        await flush()
+
+    elapsed = time.perf_counter() - start
+    report["elapsed_sec"] = round(elapsed, 3)
+    report["rows_per_sec"] = round(report["rows"] / elapsed, 1) if elapsed else 0.0
+    report["errors_truncated"] = report["failed"] > len(report["errors"])
+    return report
+
+async def _file_chunks(path: str, size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, size):
+            yield chunk
+
+async def main(args):
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    report = await import_users(_file_chunks(args.path), fmt, chunk_size=args.chunk_size)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import of users from CSV or NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument("--chunk-size", type=int, default=settings.USER_IMPORT_CHUNK_SIZE)
+    asyncio.run(main(parser.parse_args()))
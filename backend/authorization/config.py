@@ -8,11 +8,51 @@ class Settings(BaseSettings):
     YANDEX_CLIENT_ID: str = os.getenv("YANDEX_CLIENT_ID", "TODO")
     YANDEX_CLIENT_SECRET: str = os.getenv("YANDEX_CLIENT_SECRET", "TODO")
     YANDEX_REDIRECT_URI: str = os.getenv("YANDEX_REDIRECT_URI", "TODO")
+    YANDEX_OAUTH_URL: str = "https://oauth.yandex.ru"
+    YANDEX_LOGIN_URL: str = "https://login.yandex.ru"
+    YANDEX_HTTP2: bool = True
+    YANDEX_MAX_CONNECTIONS: int = 20
+    YANDEX_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    YANDEX_KEEPALIVE_EXPIRY_SEC: float = 60.0
+    YANDEX_CONNECT_TIMEOUT_SEC: float = 3.0
+    YANDEX_READ_TIMEOUT_SEC: float = 5.0
+    YANDEX_BREAKER_FAILURES: int = 5
+    YANDEX_BREAKER_RESET_SEC: float = 30.0
 
     JWT_SECRET: str = os.getenv("JWT_SECRET", "TODO")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_SEC: int = 15 * 60
     REFRESH_TOKEN_EXPIRE_SEC: int = 30 * 24 * 3600
+    REFRESH_PURGE_INTERVAL_SEC: int = 3600
+    REFRESH_CACHE_SIZE: int = 100000
+    REFRESH_CACHE_SWEEP_SEC: int = 60
+    REFRESH_CACHE_TTL_SEC: float = 300.0
+    JWT_CACHE_SIZE: int = 10000
+    PROFILE_CACHE_SIZE: int = 10000
+    PROFILE_CACHE_TTL_SEC: float = 30.0
+    STATUS_FLUSH_INTERVAL_SEC: float = 1.0
+    STATUS_BUFFER_MAX_PENDING: int = 10000
+
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SEC: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SEC: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+
+    USER_SEARCH_SIMILARITY_THRESHOLD: float = 0.3
+    USER_BATCH_MAX_IDS: int = 500
+    USER_IMPORT_CHUNK_SIZE: int = 1000
+    USER_IMPORT_MAX_ERRORS: int = 1000
+
+    # serialize responses with prebuilt TypeAdapters instead of response_model
+    FAST_RESPONSES: bool = False
+
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: dict[str, str] = {}
+    LOG_SAMPLE_RATES: dict[str, float] = {"backend.common.middlewares": 0.01}
+    LOG_QUEUE_SIZE: int = 10000
 
 
     FRONTEND_HOME: str = "http://localhost:3000/"
@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase, mapped_column, Mapped, relationship
-from sqlalchemy import Integer, String, Text, Enum, ForeignKey, func, Boolean, DateTime, text
+from sqlalchemy import Integer, String, Text, Enum, ForeignKey, func, Boolean, DateTime, text, Index, literal_column
 import enum
 from typing import Optional
 from datetime import datetime
@@ -9,6 +9,10 @@ from dotenv import load_dotenv
 import os
 import logging
 
+from backend.authorization.config import settings
+from backend.common.db_metrics import PoolMetrics
+from backend.common.db_schema import create_missing_indexes, run_migrations
+
 load_dotenv()
 
 DB_HOST = os.getenv("DB_HOST")
@@ -17,22 +21,30 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
-LOG_FILE = os.path.join("logs", "users.log")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=LOG_FILE,
-)
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+pool_metrics = PoolMetrics()
+
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,
+    poolclass=pool_metrics.pool_class,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE_SEC,
+    connect_args={
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)},
+    },
 )
 
+pool_metrics.attach(engine)
+
 new_session = async_sessionmaker(
     bind=engine,
     expire_on_commit=False,
@@ -67,12 +79,63 @@ class Users(Base):
     team: Mapped[str] = mapped_column(String(50), nullable=False)
     role: Mapped[UserRole] = mapped_column(Enum(UserRole), nullable=False)
     status: Mapped[UserStatus] = mapped_column(Enum(UserStatus), default=UserStatus.INACTIVE, nullable=False)
-    refresh_token: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # bumped by every profile update, drives the ETag
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_users_surname_id", "surname", "id"),
+    )
+
+class RefreshSessions(Base):
+    __tablename__ = "refresh_sessions"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    device: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+USER_TRGM_FIELDS = ("name", "surname", "patronymic", "email", "phone", "telegram_link", "post", "team")
+USER_SEARCH_FIELDS = ("surname", "name", "patronymic", "email", "post", "team")
+
+def user_search_document():
+    # Must stay IMMUTABLE and identical to the expression of ix_users_search_trgm,
+    # otherwise the planner will not use the index
+    columns = [getattr(Users, field) for field in USER_SEARCH_FIELDS]
+    document = columns[0]
+    for column in columns[1:]:
+        document = document.op("||")(literal_column("' '")).op("||")(column)
+    return document
+
+for field in USER_TRGM_FIELDS:
+    Index(
+        f"ix_users_{field}_trgm",
+        getattr(Users, field),
+        postgresql_using="gin",
+        postgresql_ops={field: "gin_trgm_ops"},
+    )
+
+Index(
+    "ix_users_search_trgm",
+    user_search_document().label("search_document"),
+    postgresql_using="gin",
+    postgresql_ops={"search_document": "gin_trgm_ops"},
+)
+
+MIGRATIONS = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now()",
+]
 
 async def create_tables():
     async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations, MIGRATIONS)
+        await conn.run_sync(create_missing_indexes, Base.metadata)
     logger.debug("Database tables created successfully.")
 
 async def register_admin():
@@ -89,7 +152,6 @@ async def register_admin():
                 team="Admin Team",
                 role=UserRole.ADMIN,
                 status=UserStatus.ACTIVE,
-                refresh_token=None,
             )
 
             result = await session.execute(
@@ -1,11 +1,31 @@
-from sqlalchemy import select, delete, and_
+from sqlalchemy import select, update as sa_update, delete, and_, func, literal, bindparam, any_, String, Integer, DateTime, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert, ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from fastapi import Depends, HTTPException
 from typing import Optional
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
 
-from backend.authorization.database.database import Users, UserRole, get_async_session, UserStatus
+from backend.authorization.database.database import Users, UserRole, get_async_session, UserStatus, RefreshSessions, new_session
+from backend.authorization.database.database import USER_TRGM_FIELDS, user_search_document
 from backend.authorization.models import User, UserRead, UserUpdate, UserFilter
+from backend.authorization.jwt_utils import hash_refresh_token
+from backend.authorization.refresh_tokens import refresh_token_store
+from backend.authorization.profile_cache import profile_cache
+from backend.authorization.status_buffer import status_buffer
+from backend.authorization.config import settings
+from backend.common.cursors import encode_cursor, decode_cursor
+
+logger = logging.getLogger(__name__)
+
+def _trgm_condition(column, value: str):
+    # Substring match with LIKE wildcards escaped. pg_trgm needs at least
+    # three characters to use the GIN index; shorter values fall back to a
+    # scan, which keeps "al" matching "Natalia".
+    escaped = value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return column.ilike(f"%{escaped}%", escape="!")
 
 class OrmDatabaseManager:
     def __init__(self, session: AsyncSession):
@@ -49,95 +69,259 @@ class OrmDatabaseManager:
         return result.scalar_one_or_none()
 
     async def update_user(self, user_id: int, update: UserUpdate) -> UserRead:
-        user = await self.get_user_db_by_id(user_id)
+        fields = update.dict(exclude_unset=True)
+        if "status" in fields:
+            await status_buffer.supersede(user_id)
+        result = await self.session.execute(
+            sa_update(Users)
+            .where(Users.id == user_id)
+            .values(**fields, version=Users.version + 1)
+            .returning(Users)
+            .execution_options(synchronize_session=False)
+        )
+        user = result.scalar_one_or_none()
 
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        for field, value in update.dict(exclude_unset=True).items():
-            setattr(user, field, value)
-
         await self.session.commit()
-        await self.session.refresh(user)
-        return user
+
+        user_read = UserRead.model_validate(user)
+        profile_cache.invalidate(user_id)
+        profile_cache.put(user_id, profile_cache.version(user_id), user_read)
+        if "role" in fields:
+            refresh_token_store.invalidate_user(user_id)
+        if "status" not in fields:
+            # a status still in the buffer is newer than the stored one
+            return status_buffer.overlay(user_read)
+        return user_read
+
+    async def get_user_version(self, user_id: int) -> Optional[int]:
+        result = await self.session.execute(
+            select(Users.version).where(Users.id == user_id)
+        )
+        return result.scalar_one_or_none()
 
     async def get_user_by_id(self, user_id: int) -> UserRead:
+        cached = profile_cache.get(user_id)
+        if cached is not None:
+            return status_buffer.overlay(cached)
+
+        version = profile_cache.version(user_id)
         stmt = select(Users).where(Users.id == user_id)
         result = await self.session.execute(stmt)
         user = result.scalar_one_or_none()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        return UserRead.model_validate(user)
+        user_read = UserRead.model_validate(user)
+        profile_cache.put(user_id, version, user_read)
+        return status_buffer.overlay(user_read)
+
+    async def get_users_by_ids(self, user_ids: list[int]) -> dict[int, UserRead]:
+        users = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            cached = profile_cache.get(user_id)
+            if cached is not None:
+                users[user_id] = cached
+            else:
+                missing.append(user_id)
+
+        if missing:
+            versions = {user_id: profile_cache.version(user_id) for user_id in missing}
+            # a single array parameter keeps one prepared statement for any count
+            result = await self.session.execute(
+                select(Users).where(Users.id == any_(bindparam("user_ids", missing, type_=ARRAY(Integer))))
+            )
+            for user in result.scalars():
+                user_read = UserRead.model_validate(user)
+                profile_cache.put(user.id, versions[user.id], user_read)
+                users[user.id] = user_read
+        return {user_id: status_buffer.overlay(user) for user_id, user in users.items()}
 
-    async def search_users(self, filters: UserFilter) -> list[Users]:
+    async def search_users(self, filters: UserFilter) -> tuple[list[Users], Optional[str]]:
         stmt = select(Users)
 
         conditions = []
 
-        if filters.name:
-            conditions.append(Users.name.ilike(f"%{filters.name}%"))
-        if filters.surname:
-            conditions.append(Users.surname.ilike(f"%{filters.surname}%"))
-        if filters.patronymic:
-            conditions.append(Users.patronymic.ilike(f"%{filters.patronymic}%"))
-        if filters.email:
-            conditions.append(Users.email.ilike(f"%{filters.email}%"))
-        if filters.phone:
-            conditions.append(Users.phone.ilike(f"%{filters.phone}%"))
-        if filters.telegram_link:
-            conditions.append(Users.telegram_link.ilike(f"%{filters.telegram_link}%"))
-        if filters.post:
-            conditions.append(Users.post.ilike(f"%{filters.post}%"))
-        if filters.team:
-            conditions.append(Users.team.ilike(f"%{filters.team}%"))
+        for field in USER_TRGM_FIELDS:
+            value = getattr(filters, field)
+            if value:
+                conditions.append(_trgm_condition(getattr(Users, field), value))
         if filters.role:
             conditions.append(Users.role == filters.role)
         if filters.status:
             conditions.append(Users.status == filters.status)
 
+        if filters.q:
+            if filters.cursor:
+                raise HTTPException(status_code=400, detail="cursor cannot be combined with q")
+
+            document = user_search_document()
+            await self.session.execute(
+                select(func.set_config(
+                    "pg_trgm.word_similarity_threshold",
+                    str(settings.USER_SEARCH_SIMILARITY_THRESHOLD),
+                    True,
+                ))
+            )
+            conditions.append(literal(filters.q).op("<%")(document))
+            stmt = stmt.order_by(func.word_similarity(filters.q, document).desc(), Users.id)
+        else:
+            # keyset order, served by ix_users_surname_id
+            stmt = stmt.order_by(Users.surname, Users.id)
+
+        if filters.cursor:
+            try:
+                surname, last_id = decode_cursor(filters.cursor, 2)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            conditions.append(tuple_(Users.surname, Users.id) > tuple_(surname, last_id))
+
         if conditions:
             stmt = stmt.where(and_(*conditions))
 
-        stmt = stmt.limit(filters.limit).offset(filters.offset)
+        stmt = stmt.limit(filters.limit + 1)
+        if not filters.cursor:
+            stmt = stmt.offset(filters.offset)
 
         result = await self.session.execute(stmt)
-        users = result.scalars().all()
-        return users
+        users = list(result.scalars().all())
+
+        next_cursor = None
+        if len(users) > filters.limit:
+            users = users[:filters.limit]
+            if not filters.q:
+                next_cursor = encode_cursor(users[-1].surname, users[-1].id)
+        return users, next_cursor
 
     async def delete_user(self, user_id: int) -> None:
-            stmt = select(Users).where(Users.id == user_id)
-            result = await self.session.execute(stmt)
-            user = result.scalar_one_or_none()
-            if not user:
+            result = await self.session.execute(
+                delete(Users).where(Users.id == user_id).returning(Users.id)
+            )
+            if result.scalar_one_or_none() is None:
                 raise HTTPException(status_code=404, detail="User not found")
 
-            await self.session.delete(user)
             await self.session.commit()
 
-    async def save_refresh_token(self, user_id: int, refresh_token: str):
-        user = await self.get_user_db_by_id(user_id)
-        if user:
-            user.refresh_token = refresh_token
+            profile_cache.invalidate(user_id)
+            status_buffer.discard(user_id)
+            refresh_token_store.invalidate_user(user_id)
+
+    async def save_refresh_token(self, user_id: int, refresh_token: str, device: Optional[str] = None):
+        refresh_session = RefreshSessions(
+            user_id=user_id,
+            token_hash=hash_refresh_token(refresh_token),
+            device=device[:255] if device else None,
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=settings.REFRESH_TOKEN_EXPIRE_SEC),
+        )
+        self.session.add(refresh_session)
+        await self.session.commit()
+
+    async def upsert_user_with_refresh_token(
+        self,
+        user: User,
+        refresh_token: str,
+        device: Optional[str] = None,
+    ) -> dict:
+        # WITH upserted_user AS (INSERT ... ON CONFLICT (email) DO UPDATE ... RETURNING id, role),
+        #      refresh_session AS (INSERT INTO refresh_sessions SELECT ... FROM upserted_user)
+        # SELECT id, role FROM upserted_user
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.REFRESH_TOKEN_EXPIRE_SEC)
+
+        insert_user = pg_insert(Users).values(
+            name=user.name,
+            surname=user.surname,
+            patronymic=user.patronymic,
+            email=user.email,
+            phone=user.phone,
+            telegram_link=user.telegram_link,
+            post=user.post,
+            team=user.team,
+            role=UserRole(user.role),
+            status=UserStatus(user.status),
+        )
+        upserted_user = (
+            insert_user
+            .on_conflict_do_update(
+                index_elements=[Users.email],
+                set_={"email": insert_user.excluded.email},
+            )
+            .returning(Users.id, Users.role)
+            .cte("upserted_user")
+        )
+        refresh_session = (
+            pg_insert(RefreshSessions)
+            .from_select(
+                ["user_id", "token_hash", "device", "expires_at"],
+                select(
+                    upserted_user.c.id,
+                    literal(hash_refresh_token(refresh_token), String),
+                    literal(device[:255] if device else None, String),
+                    literal(expires_at, DateTime(timezone=True)),
+                ),
+            )
+            .cte("refresh_session")
+        )
+        stmt = select(upserted_user.c.id, upserted_user.c.role).add_cte(refresh_session)
+
+        try:
+            result = await self.session.execute(stmt)
+            row = result.one()
             await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+
+        return { "user_id": row.id, "role": row.role, "expires": expires_at.timestamp() }
 
     async def get_refresh_token(self, refresh_token: str) -> Optional[dict]:
         result = await self.session.execute(
-            select(Users).where(Users.refresh_token == refresh_token)
+            select(Users.id, Users.role, RefreshSessions.expires_at)
+            .join(RefreshSessions, RefreshSessions.user_id == Users.id)
+            .where(
+                RefreshSessions.token_hash == hash_refresh_token(refresh_token),
+                RefreshSessions.expires_at > func.now(),
+            )
         )
 
-        user = result.scalar_one_or_none()
+        row = result.first()
 
-        if not user:
+        if not row:
             return None
-        
-        return { "user_id": user.id, "role": user.role }
 
-    async def delete_refresh_token(self, user_id: int):
-        user = await self.get_user_db_by_id(user_id)
-        if user:
-            user.refresh_token = None
-            await self.session.commit()
+        return { "user_id": row.id, "role": row.role, "expires": row.expires_at.timestamp() }
+
+    async def delete_refresh_token(self, refresh_token: str):
+        await self.session.execute(
+            delete(RefreshSessions).where(RefreshSessions.token_hash == hash_refresh_token(refresh_token))
+        )
+        await self.session.commit()
+
+    async def delete_user_refresh_tokens(self, user_id: int):
+        await self.session.execute(
+            delete(RefreshSessions).where(RefreshSessions.user_id == user_id)
+        )
+        await self.session.commit()
+
+    async def purge_expired_refresh_tokens(self) -> int:
+        result = await self.session.execute(
+            delete(RefreshSessions).where(RefreshSessions.expires_at <= func.now())
+        )
+        await self.session.commit()
+        return result.rowcount
 
 async def get_db_manager(session: AsyncSession = Depends(get_async_session)) -> OrmDatabaseManager:
     return OrmDatabaseManager(session)
+
+async def purge_expired_refresh_tokens_periodically(interval: float):
+    while True:
+        try:
+            async with new_session() as session:
+                purged = await OrmDatabaseManager(session).purge_expired_refresh_tokens()
+            if purged:
+                logger.info(f"Purged {purged} expired refresh sessions")
+        except Exception as e:
+            logger.error(f"Error purging expired refresh sessions: {e}")
+        await asyncio.sleep(interval)
@@ -1,4 +1,5 @@
 from jose import jwt
+import hashlib
 import time
 
 from backend.authorization.config import settings
@@ -13,3 +14,6 @@ def create_access_token(user_id: int, role: str) -> str:
 
 def decode_access_token(token: str) -> dict:
     return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
@@ -1,24 +1,41 @@
 from fastapi import FastAPI, HTTPException, Request
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.authorization.database.database import create_tables, register_admin, delete_tables
+from backend.authorization.database.database import create_tables, register_admin, delete_tables, pool_metrics
+from backend.authorization.database.orm_db import purge_expired_refresh_tokens_periodically
+from backend.authorization.refresh_tokens import refresh_token_store, sweep_refresh_tokens_periodically
+from backend.authorization.profile_cache import profile_cache
+from backend.authorization.status_buffer import status_buffer, flush_status_buffer_periodically
+from backend.authorization.yandex_client import init_client, close_client
 from backend.authorization.router import auth_router as auth_router
 from backend.authorization.router import user_router as user_router
-from backend.authorization.middlewares import AuthMiddleware
+from backend.authorization.middlewares import AuthMiddleware, token_cache
+from backend.authorization.config import settings
+from backend.common.logging_setup import setup_logging, stop_logging
+from backend.common.metrics import metrics_router, register_metrics
 
 LOG_FILE = os.path.join("logs", "users.log")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=LOG_FILE,
+log_listener = setup_logging(
+    LOG_FILE,
+    level=settings.LOG_LEVEL,
+    levels=settings.LOG_LEVELS,
+    sample_rates=settings.LOG_SAMPLE_RATES,
+    queue_size=settings.LOG_QUEUE_SIZE,
 )
 
 logger = logging.getLogger(__name__)
 
+register_metrics("db_pool", pool_metrics.stats)
+register_metrics("jwt_cache", token_cache.stats)
+register_metrics("refresh_token_cache", refresh_token_store.stats)
+register_metrics("profile_cache", profile_cache.stats)
+register_metrics("status_buffer", status_buffer.stats)
+
 app = FastAPI()
 
 @asynccontextmanager
@@ -31,11 +48,30 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error creating user service database tables: {e}")
         raise HTTPException(status_code=500, detail="Database initialization failed")
+
+    await init_client()
+
+    purge_task = asyncio.create_task(
+        purge_expired_refresh_tokens_periodically(settings.REFRESH_PURGE_INTERVAL_SEC)
+    )
+    sweep_task = asyncio.create_task(
+        sweep_refresh_tokens_periodically(refresh_token_store, settings.REFRESH_CACHE_SWEEP_SEC)
+    )
+    status_task = asyncio.create_task(
+        flush_status_buffer_periodically(status_buffer, settings.STATUS_FLUSH_INTERVAL_SEC)
+    )
     yield
 
+    purge_task.cancel()
+    sweep_task.cancel()
+    status_task.cancel()
+    await status_buffer.flush()
+    await close_client()
+
     # await delete_tables()
 
     logger.info("Shutting down the user service...")
+    stop_logging(log_listener)
 
 app = FastAPI(lifespan=lifespan)
 
@@ -49,8 +85,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+app.include_router(metrics_router("/api/auth"))
+
 app.include_router(auth_router)
 
 
@@ -1,7 +1,8 @@
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from backend.authorization.database.database import UserRole, UserStatus
+from backend.authorization.config import settings
 
 class User(BaseModel):
     name: str
@@ -15,8 +16,21 @@ class User(BaseModel):
     role: UserRole
     status: UserStatus = UserStatus.INACTIVE
 
+class UserImport(User):
+    # bulk import rows are checked against the column sizes, so an oversized
+    # value is reported for its own line instead of failing the whole chunk
+    name: str = Field(max_length=255)
+    surname: str = Field(max_length=255)
+    patronymic: str = Field(max_length=255)
+    email: str = Field(max_length=255)
+    phone: str = Field(max_length=20)
+    telegram_link: Optional[str] = Field(None, max_length=255)
+    post: str = Field(max_length=50)
+    team: str = Field(max_length=50)
+
 class UserRead(User):
     id: int
+    version: int
 
     class Config:
         from_attributes = True
@@ -33,6 +47,7 @@ class UserUpdate(BaseModel):
     status: Optional[UserStatus] = None
 
 class UserFilter(BaseModel):
+    q: Optional[str] = None
     name: Optional[str] = None
     surname: Optional[str] = None
     patronymic: Optional[str] = None
@@ -45,6 +60,14 @@ class UserFilter(BaseModel):
     status: Optional[UserStatus] = None
     limit: Optional[int] = 100
     offset: Optional[int] = 0
+    cursor: Optional[str] = None
 
 class UpdateStatus(BaseModel):
-    status: UserStatus
\ No newline at end of file
+    status: UserStatus
+class UserBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=settings.USER_BATCH_MAX_IDS)
+
+class UserBatchRead(BaseModel):
+    # one entry per requested id, in request order, None where not found
+    users: List[Optional[UserRead]]
+    missing: List[int]
@@ -0,0 +1,68 @@
+from collections import OrderedDict
+import time
+
+from backend.authorization.models import UserRead
+from backend.authorization.config import settings
+
+class ProfileCache:
+    # LRU of UserRead profiles keyed by user id. Readers take version() before
+    # loading from the database and store with it; invalidate() bumps the
+    # version, so a read that raced with a write cannot put the old profile
+    # back. Entries also expire after `ttl` seconds, which bounds how stale a
+    # profile can get when another worker process did the write.
+    def __init__(self, maxsize: int = 10000, ttl: float = 30.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[int, tuple[int, float, UserRead]] = OrderedDict()
+        self._versions: dict[int, int] = {}
+
+    def version(self, user_id: int) -> int:
+        return self._versions.get(user_id, 0)
+
+    def peek(self, user_id: int) -> UserRead | None:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] != self.version(user_id) or entry[1] <= self.clock():
+            return None
+        return entry[2]
+
+    def get(self, user_id: int) -> UserRead | None:
+        user = self.peek(user_id)
+        if user is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def put(self, user_id: int, version: int, user: UserRead) -> None:
+        if self.maxsize <= 0 or version != self.version(user_id):
+            return
+
+        self._entries[user_id] = (version, self.clock() + self.ttl, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._versions[user_id] = self.version(user_id) + 1
+        self._entries.pop(user_id, None)
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+profile_cache = ProfileCache(maxsize=settings.PROFILE_CACHE_SIZE, ttl=settings.PROFILE_CACHE_TTL_SEC)
@@ -1,11 +1,131 @@
+from collections import OrderedDict
+import asyncio
+import heapq
+import logging
+import time
 
-_store = {}
+from backend.authorization.jwt_utils import hash_refresh_token
+from backend.authorization.config import settings
 
-def save_refresh_token(token: str, email: str, expires: int):
-    _store[token] = {"email": email, "expires": expires}
+logger = logging.getLogger(__name__)
 
-def get_refresh_token(token: str):
-    return _store.get(token)
+class RefreshTokenStore:
+    # Cache of refresh_sessions rows keyed by token hash. Expiry is tracked in
+    # time buckets of `resolution` seconds, so a sweep only visits buckets that
+    # are already due instead of scanning every entry. An entry is kept for at
+    # most `ttl` seconds, so a role changed by another process (such as the
+    # bulk import CLI) reaches refreshed access tokens after that time.
+    def __init__(self, maxsize: int = 100000, resolution: int = 60, ttl: float = 300.0, clock=time.time):
+        self.maxsize = maxsize
+        self.resolution = resolution
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._buckets: dict[int, set[str]] = {}
+        self._bucket_heap: list[int] = []
+        self._by_user: dict[int, set[str]] = {}
 
-def delete_refresh_token(token: str):
-    _store.pop(token, None)
+    def save(self, token: str, user_id: int, role, expires: float) -> None:
+        now = self.clock()
+        if self.maxsize <= 0 or expires <= now:
+            return
+
+        key = hash_refresh_token(token)
+        self._discard(key)
+
+        cached_until = min(expires, now + self.ttl)
+        bucket = int(cached_until // self.resolution) + 1
+        self._entries[key] = {
+            "user_id": user_id,
+            "role": role,
+            "expires": expires,
+            "cached_until": cached_until,
+            "bucket": bucket,
+        }
+
+        if bucket not in self._buckets:
+            self._buckets[bucket] = set()
+            heapq.heappush(self._bucket_heap, bucket)
+        self._buckets[bucket].add(key)
+        self._by_user.setdefault(user_id, set()).add(key)
+
+        while len(self._entries) > self.maxsize:
+            self._discard(next(iter(self._entries)))
+
+    def get(self, token: str) -> dict | None:
+        key = hash_refresh_token(token)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry["cached_until"] <= self.clock():
+            self._discard(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return {"user_id": entry["user_id"], "role": entry["role"], "expires": entry["expires"]}
+
+    def delete(self, token: str) -> None:
+        self._discard(hash_refresh_token(token))
+
+    def invalidate_user(self, user_id: int) -> None:
+        for key in list(self._by_user.get(user_id, ())):
+            self._discard(key)
+
+    def sweep(self) -> int:
+        due = int(self.clock() // self.resolution)
+        swept = 0
+        while self._bucket_heap and self._bucket_heap[0] <= due:
+            bucket = heapq.heappop(self._bucket_heap)
+            for key in list(self._buckets.get(bucket, ())):
+                self._discard(key)
+                swept += 1
+            self._buckets.pop(bucket, None)
+        return swept
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        keys = self._buckets.get(entry["bucket"])
+        if keys is not None:
+            keys.discard(key)
+
+        user_keys = self._by_user.get(entry["user_id"])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._by_user[entry["user_id"]]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+refresh_token_store = RefreshTokenStore(
+    maxsize=settings.REFRESH_CACHE_SIZE,
+    resolution=settings.REFRESH_CACHE_SWEEP_SEC,
+    ttl=settings.REFRESH_CACHE_TTL_SEC,
+)
+
+async def sweep_refresh_tokens_periodically(store: RefreshTokenStore, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        swept = store.sweep()
+        if swept:
+            logger.debug(f"Swept {swept} expired refresh tokens from cache")
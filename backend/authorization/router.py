@@ -1,24 +1,22 @@
-from fastapi import APIRouter, Response, Request, HTTPException, status, Cookie, Depends
+from fastapi import APIRouter, Response, Request, HTTPException, status, Cookie, Depends, Query
 from fastapi.responses import RedirectResponse, JSONResponse
 import secrets
 import time
-import os
 import logging
 
-from backend.authorization.yandex_client import build_auth_url, exchange_code_for_token, get_user_info
+from backend.authorization.yandex_client import build_auth_url, exchange_code_for_token, get_user_info, YandexUnavailableError
 from backend.authorization.jwt_utils import create_access_token, decode_access_token
+from backend.authorization.refresh_tokens import refresh_token_store
+from backend.authorization.profile_cache import profile_cache
+from backend.authorization.status_buffer import status_buffer
+from backend.authorization.bulk_import import IMPORT_FORMATS, import_users
 
 from backend.authorization.database.orm_db import OrmDatabaseManager, get_db_manager, UserStatus
-from backend.authorization.models import User, UserRead, UserUpdate, UserFilter, UpdateStatus
+from backend.authorization.models import User, UserRead, UserUpdate, UserFilter, UpdateStatus, UserBatchRequest, UserBatchRead
 from backend.authorization.config import settings
-
-LOG_FILE = os.path.join("logs", "users.log")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=LOG_FILE,
-)
+from backend.common.http_cache import make_etag, etag_matches, not_modified
+from backend.common.fast_json import json_response
+from pydantic import TypeAdapter
 
 logger = logging.getLogger(__name__)
 
@@ -33,18 +31,23 @@ def login():
 async def callback(
     code: str,
     response: Response,
+    request: Request,
     db_manager: OrmDatabaseManager = Depends(get_db_manager),
 ):
-    yandex_token = await exchange_code_for_token(code)
-    userinfo = await get_user_info(yandex_token)
+    try:
+        yandex_token = await exchange_code_for_token(code)
+        userinfo = await get_user_info(yandex_token)
+    except YandexUnavailableError:
+        raise HTTPException(status_code=503, detail="Yandex OAuth is unavailable")
     email = userinfo.get("default_email")
 
     # if not email or not email.endswith(settings.CORPORATE_DOMAIN):
     #     raise HTTPException(status_code=403, detail="Access denied")
 
-    user = await db_manager.get_user_by_email(email)
-    if not user:
-        user = User(
+    refresh_token = secrets.token_hex(32)
+
+    token_data = await db_manager.upsert_user_with_refresh_token(
+        User(
             name="anonim",
             surname="anonimov",
             patronymic="anonimovich",
@@ -54,13 +57,13 @@ async def callback(
             post="guest",
             team="guest",
             role="user",
-        )
-        user = await db_manager.register_user(user)
-
-    access_token = create_access_token(user_id=user.id, role=user.role.value)
-    refresh_token = secrets.token_hex(32)
+        ),
+        refresh_token=refresh_token,
+        device=request.headers.get("user-agent"),
+    )
+    refresh_token_store.save(refresh_token, **token_data)
 
-    await db_manager.save_refresh_token(user_id=user.id, refresh_token=refresh_token)
+    access_token = create_access_token(user_id=token_data["user_id"], role=token_data["role"].value)
 
     response = RedirectResponse(url=settings.FRONTEND_HOME)
     response.set_cookie("access_token", access_token, httponly=True, secure=True, samesite="none", max_age=settings.ACCESS_TOKEN_EXPIRE_SEC)
@@ -81,9 +84,12 @@ async def refresh(
             content={"detail": "Invalid or expired refresh token"},
         )
     
-    token_data = await db_manager.get_refresh_token(token)
+    token_data = refresh_token_store.get(token)
     if not token_data:
-        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+        token_data = await db_manager.get_refresh_token(token)
+        if not token_data:
+            raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+        refresh_token_store.save(token, **token_data)
 
     if not token_data.get("user_id") or not token_data.get("role"):
         raise HTTPException(status_code=401, detail="Invalid token data")
@@ -94,8 +100,59 @@ async def refresh(
     response.set_cookie("access_token", new_access_token, httponly=True, secure=True, max_age=settings.ACCESS_TOKEN_EXPIRE_SEC)
     return response
 
+@auth_router.post("/logout")
+async def logout(
+    request: Request,
+    db_manager: OrmDatabaseManager = Depends(get_db_manager),
+):
+    token = request.cookies.get("refresh_token")
+
+    if token:
+        refresh_token_store.delete(token)
+        await db_manager.delete_refresh_token(token)
+
+    response = JSONResponse({"message": "logged out"})
+    response.delete_cookie("access_token", httponly=True, secure=True, samesite="none")
+    response.delete_cookie("refresh_token", httponly=True, secure=True, samesite="none")
+    return response
+
 user_router = APIRouter(prefix="/api/users")
 
+user_json = TypeAdapter(UserRead)
+user_list_json = TypeAdapter(list[UserRead])
+
+async def _get_user_conditional(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db_manager: OrmDatabaseManager,
+):
+    # without a cached profile or a buffered status a version-only lookup is
+    # enough to answer If-None-Match with 304
+    if (
+        request.headers.get("if-none-match")
+        and profile_cache.peek(user_id) is None
+        and status_buffer.get(user_id) is None
+    ):
+        version = await db_manager.get_user_version(user_id)
+        if version is not None:
+            etag = make_etag("user", user_id, version)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+    user = await db_manager.get_user_by_id(user_id)
+
+    etag = make_etag("user", user.id, user.version)
+    if status_buffer.get(user_id) is not None:
+        # the buffered status is not in the version yet
+        etag = make_etag("user", user.id, user.version, user.status.value)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    if settings.FAST_RESPONSES:
+        return json_response(user_json, user, headers=response.headers)
+    return user
+
 @user_router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user: User,
@@ -110,13 +167,10 @@ async def create_user(
 @user_router.get("/me", response_model=UserRead)
 async def get_myself(
     request: Request,
+    response: Response,
     db_manager: OrmDatabaseManager = Depends(get_db_manager),
 ):
-    user_id = request.state.user_id
-    user = await db_manager.get_user_by_id(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Пользователь не найден")
-    return user
+    return await _get_user_conditional(request.state.user_id, request, response, db_manager)
 
 @user_router.patch("/me", response_model=UserRead)
 async def update_current_user(
@@ -124,13 +178,7 @@ async def update_current_user(
     request: Request,
     db_manager: OrmDatabaseManager = Depends(get_db_manager),
 ):
-    user_id = request.state.user_id
-    user = await db_manager.get_user_by_id(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Пользователь не найден")
-
-    updated = await db_manager.update_user(user_id, update)
-    return updated
+    return await db_manager.update_user(request.state.user_id, update)
 
 @user_router.patch("/me/update_status", response_model=UserRead)
 async def update_current_user_status(
@@ -140,18 +188,60 @@ async def update_current_user_status(
 ):
     user_id = request.state.user_id
 
-    status_enum = status.status
-
-    update = UserUpdate (
-        status=status_enum
+    # buffered and written in batches, see StatusBuffer
+    user = await db_manager.get_user_by_id(user_id)
+    status_buffer.set(user_id, status.status)
+    if status_buffer.full:
+        await status_buffer.flush()
+    return status_buffer.overlay(user)
+
+async def _get_users_batch(user_ids: list[int], db_manager: OrmDatabaseManager) -> UserBatchRead:
+    if len(user_ids) > settings.USER_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Не больше {settings.USER_BATCH_MAX_IDS} id за запрос")
+
+    found = await db_manager.get_users_by_ids(user_ids)
+    return UserBatchRead(
+        users=[found.get(user_id) for user_id in user_ids],
+        missing=[user_id for user_id in dict.fromkeys(user_ids) if user_id not in found],
     )
 
-    user = await db_manager.get_user_by_id(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Пользователь не найден")
+@user_router.post("/import")
+async def import_users_endpoint(
+    request: Request,
+    format: str | None = Query(None, description="csv или ndjson, по умолчанию по Content-Type"),
+):
+    if getattr(request.state, "role", None) != "admin":
+        raise HTTPException(status_code=403, detail="Forbidden: insufficient permissions")
+
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv"
+    elif format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Формат должен быть csv или ndjson")
 
-    updated = await db_manager.update_user(user_id, update)
-    return updated
+    # the request body is consumed as it arrives, chunks get their own sessions
+    return await import_users(request.stream(), format)
+
+@user_router.get("/batch", response_model=UserBatchRead)
+async def get_users_batch(
+    ids: list[str] = Query(..., description="id пользователей через запятую или повторяющимся параметром"),
+    db_manager: OrmDatabaseManager = Depends(get_db_manager),
+):
+    try:
+        user_ids = [int(part) for value in ids for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids должны быть целыми числами")
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="Не указаны id пользователей")
+
+    return await _get_users_batch(user_ids, db_manager)
+
+@user_router.post("/batch", response_model=UserBatchRead)
+async def post_users_batch(
+    batch: UserBatchRequest,
+    db_manager: OrmDatabaseManager = Depends(get_db_manager),
+):
+    return await _get_users_batch(batch.ids, db_manager)
 
 @user_router.patch("/{user_id}", response_model=UserRead)
 async def update_user(
@@ -160,27 +250,29 @@ async def update_user(
     request: Request,
     db_manager: OrmDatabaseManager = Depends(get_db_manager),
 ):
-    user = await db_manager.get_user_by_id(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Пользователь не найден")
-
-    updated = await db_manager.update_user(user_id, update)
-    return updated
+    return await db_manager.update_user(user_id, update)
 
 @user_router.get("/{user_id}", response_model=UserRead)
 async def get_user_by_id(
     user_id: int,
+    response: Response,
     db_manager: OrmDatabaseManager = Depends(get_db_manager),
     request: Request = None,
 ):
-    return await db_manager.get_user_by_id(user_id)
+    return await _get_user_conditional(user_id, request, response, db_manager)
 
 @user_router.get("/", response_model=list[UserRead])
 async def get_users(
+    response: Response,
     filters: UserFilter = Depends(),
     db_manager: OrmDatabaseManager = Depends(get_db_manager),
 ):
-    users = await db_manager.search_users(filters)
+    users, next_cursor = await db_manager.search_users(filters)
+    users = status_buffer.overlay_all(users)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if settings.FAST_RESPONSES:
+        return json_response(user_list_json, users, headers=response.headers)
     return users
 
 @user_router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,152 @@
+from sqlalchemy import Enum, Integer, String, cast, column, update, values, func
+from sqlalchemy.exc import SQLAlchemyError
+import asyncio
+import logging
+
+from backend.authorization.database.database import Users, UserStatus, new_session
+from backend.authorization.models import UserRead
+from backend.authorization.profile_cache import profile_cache
+from backend.authorization.config import settings
+
+logger = logging.getLogger(__name__)
+
+# two bound parameters per row, asyncpg allows 32767 per statement
+FLUSH_CHUNK_SIZE = 10000
+
+def _flush_statement(items: list[tuple[int, UserStatus]]):
+    # UPDATE users SET status = CAST(pending.status AS userstatus), ...
+    # FROM (VALUES (:id, :status), ...) AS pending (id, status)
+    # WHERE users.id = pending.id AND users.status != pending.status
+    pending = values(column("id", Integer), column("status", String), name="pending").data(
+        [(user_id, status.name) for user_id, status in items]
+    )
+    new_status = cast(pending.c.status, Enum(UserStatus, name="userstatus", create_type=False))
+    return (
+        update(Users)
+        .where(Users.id == pending.c.id, Users.status != new_status)
+        .values(status=new_status, version=Users.version + 1, updated_at=func.now())
+        .returning(Users.id)
+        .execution_options(synchronize_session=False)
+    )
+
+class StatusBuffer:
+    # Write-behind buffer for presence status. Only the latest status per user
+    # is kept until the next flush, which writes the whole batch with one
+    # UPDATE ... FROM (VALUES ...). Readers overlay the pending value, so a
+    # change is visible before it reaches the database. The batch being
+    # flushed stays visible as in-flight until it is committed and the
+    # profile cache is invalidated.
+    def __init__(self, max_pending: int = 10000):
+        self.max_pending = max_pending
+        self.writes = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self._pending: dict[int, UserStatus] = {}
+        self._in_flight: dict[int, UserStatus] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def full(self) -> bool:
+        return len(self._pending) >= self.max_pending
+
+    def set(self, user_id: int, status: UserStatus) -> None:
+        self.writes += 1
+        if user_id in self._pending:
+            self.coalesced += 1
+        self._pending[user_id] = status
+
+    def get(self, user_id: int) -> UserStatus | None:
+        status = self._pending.get(user_id)
+        if status is None:
+            status = self._in_flight.get(user_id)
+        return status
+
+    def discard(self, user_id: int) -> None:
+        # a running flush skips users that are no longer in flight
+        self._pending.pop(user_id, None)
+        self._in_flight.pop(user_id, None)
+
+    async def supersede(self, user_id: int) -> None:
+        # Called before a direct write to users.status. When the user is part
+        # of the running flush, its statement may already be on the way, so
+        # wait for that flush to finish: the older value cannot then land
+        # after the direct write.
+        in_flight = user_id in self._in_flight
+        self.discard(user_id)
+        if in_flight:
+            async with self._lock:
+                pass
+
+    def overlay(self, user: UserRead) -> UserRead:
+        status = self.get(user.id)
+        if status is None or status == user.status:
+            return user
+        return user.model_copy(update={"status": status})
+
+    def overlay_all(self, users: list) -> list:
+        if not self._pending and not self._in_flight:
+            return users
+        return [self.overlay(UserRead.model_validate(user)) for user in users]
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._in_flight = batch
+
+            items = list(batch.items())
+            updated = []
+            try:
+                async with new_session() as session:
+                    async with session.begin():
+                        for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+                            chunk = [
+                                (user_id, status)
+                                for user_id, status in items[start:start + FLUSH_CHUNK_SIZE]
+                                if user_id in self._in_flight
+                            ]
+                            if chunk:
+                                result = await session.execute(_flush_statement(chunk))
+                                updated.extend(result.scalars())
+            except BaseException as e:
+                # keep the batch for the next flush, also when cancelled on
+                # shutdown; newer values set meanwhile win over it
+                for user_id, status in self._in_flight.items():
+                    self._pending.setdefault(user_id, status)
+                self._in_flight = {}
+                if not isinstance(e, SQLAlchemyError):
+                    raise
+                self.failures += 1
+                logger.error(f"Status flush of {len(batch)} users failed: {e}")
+                return 0
+
+            for user_id in updated:
+                profile_cache.invalidate(user_id)
+            self._in_flight = {}
+            self.flushes += 1
+            self.flushed += len(updated)
+            return len(updated)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "in_flight": len(self._in_flight),
+            "max_pending": self.max_pending,
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed,
+            "failures": self.failures,
+        }
+
+status_buffer = StatusBuffer(max_pending=settings.STATUS_BUFFER_MAX_PENDING)
+
+async def flush_status_buffer_periodically(buffer: StatusBuffer, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        flushed = await buffer.flush()
+        if flushed:
+            logger.debug(f"Flushed {flushed} buffered user statuses")
@@ -1,9 +1,114 @@
 import httpx
+import logging
+import time
+
 from backend.authorization.config import settings
 
-YANDEX_AUTH_URL = "https://oauth.yandex.ru/authorize"
-YANDEX_TOKEN_URL = "https://oauth.yandex.ru/token"
-YANDEX_USERINFO_URL = "https://login.yandex.ru/info"
+logger = logging.getLogger(__name__)
+
+YANDEX_AUTH_URL = f"{settings.YANDEX_OAUTH_URL}/authorize"
+YANDEX_TOKEN_URL = f"{settings.YANDEX_OAUTH_URL}/token"
+YANDEX_USERINFO_URL = f"{settings.YANDEX_LOGIN_URL}/info"
+
+class YandexUnavailableError(Exception):
+    pass
+
+class CircuitBreaker:
+    # closed -> open after `failure_threshold` consecutive failures; after
+    # `reset_timeout` one trial call is let through (half-open)
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half-open":
+            # let a single trial through, keep the rest out until it reports back
+            self.opened_at = self.clock()
+            return True
+        return state == "closed"
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+
+breaker = CircuitBreaker(
+    failure_threshold=settings.YANDEX_BREAKER_FAILURES,
+    reset_timeout=settings.YANDEX_BREAKER_RESET_SEC,
+)
+
+_client: httpx.AsyncClient | None = None
+
+def create_client(**kwargs) -> httpx.AsyncClient:
+    options = dict(
+        http2=settings.YANDEX_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.YANDEX_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.YANDEX_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.YANDEX_KEEPALIVE_EXPIRY_SEC,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.YANDEX_CONNECT_TIMEOUT_SEC,
+            read=settings.YANDEX_READ_TIMEOUT_SEC,
+            write=settings.YANDEX_READ_TIMEOUT_SEC,
+            pool=settings.YANDEX_CONNECT_TIMEOUT_SEC,
+        ),
+    )
+    options.update(kwargs)
+    return httpx.AsyncClient(**options)
+
+async def init_client(**kwargs) -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = create_client(**kwargs)
+    return _client
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = create_client()
+    return _client
+
+async def _request(method: str, url: str, **kwargs) -> httpx.Response:
+    if not breaker.allow():
+        raise YandexUnavailableError("Yandex OAuth circuit is open")
+
+    try:
+        resp = await get_client().request(method, url, **kwargs)
+    except httpx.TransportError as e:
+        breaker.record_failure()
+        logger.warning(f"Yandex request to {url} failed: {e!r}")
+        raise YandexUnavailableError(str(e)) from e
+
+    if resp.status_code >= 500:
+        breaker.record_failure()
+        raise YandexUnavailableError(f"Yandex responded with {resp.status_code}")
+
+    breaker.record_success()
+    resp.raise_for_status()
+    return resp
 
 def build_auth_url():
     return (
@@ -15,24 +120,22 @@ def build_auth_url():
     )
 
 async def exchange_code_for_token(code: str) -> str:
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            YANDEX_TOKEN_URL,
-            data={
-                "grant_type": "authorization_code",
-                "code": code,
-                "client_id": settings.YANDEX_CLIENT_ID,
-                "client_secret": settings.YANDEX_CLIENT_SECRET
-            }
-        )
-        resp.raise_for_status()
-        return resp.json()["access_token"]
+    resp = await _request(
+        "POST",
+        YANDEX_TOKEN_URL,
+        data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "client_id": settings.YANDEX_CLIENT_ID,
+            "client_secret": settings.YANDEX_CLIENT_SECRET
+        }
+    )
+    return resp.json()["access_token"]
 
 async def get_user_info(yandex_token: str) -> dict:
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            YANDEX_USERINFO_URL,
-            headers={"Authorization": f"OAuth {yandex_token}"}
-        )
-        resp.raise_for_status()
-        return resp.json()
+    resp = await _request(
+        "GET",
+        YANDEX_USERINFO_URL,
+        headers={"Authorization": f"OAuth {yandex_token}"}
+    )
+    return resp.json()
@@ -0,0 +1,104 @@
+"""Article creation benchmark: ORM unit of work vs batched INSERT ... RETURNING.
+
+Creates articles with 10, 100 and 1000 text blocks through the old path (one
+ArticleBlocks object per block, flush + refresh) and through
+OrmDatabaseManager.create_article. Needs the knowlege database from the DB_*
+environment variables; every article created here is deleted afterwards.
+
+    python -m backend.benchmarks.create_article --repeats 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import delete
+
+from backend.knowlege.database.database import Articles, ArticleBlocks, BlockType, create_tables, engine, new_session
+from backend.knowlege.database.database import apply_category_deltas
+from backend.knowlege.database.orm_db import OrmDatabaseManager
+from backend.knowlege.models import ArticleCreate
+
+CATEGORY = "benchmark-create-article"
+
+def make_article(blocks: int) -> ArticleCreate:
+    return ArticleCreate(
+        title=f"Benchmark article with {blocks} blocks",
+        description="Benchmark",
+        category=CATEGORY,
+        blocks_data=[
+            {"block_type": "text", "content": f"Paragraph {i} " * 20, "position": i}
+            for i in range(blocks)
+        ],
+    )
+
+async def legacy_create(article_data: ArticleCreate) -> int:
+    async with new_session() as session:
+        article = Articles(title=article_data.title, description=article_data.description, category=article_data.category)
+        session.add(article)
+        for block_data in article_data.blocks_data:
+            session.add(ArticleBlocks(
+                block_type=BlockType(block_data.block_type),
+                content=block_data.content,
+                position=block_data.position,
+                article=article,
+            ))
+        await session.flush()
+        await OrmDatabaseManager(session)._touch_article(article.id, bump_version=False)
+        await apply_category_deltas(session, {article_data.category: 1})
+        await session.commit()
+        await session.refresh(article)
+        return article.id
+
+async def batched_create(article_data: ArticleCreate) -> int:
+    async with new_session() as session:
+        article = await OrmDatabaseManager(session).create_article(article_data)
+        return article["id"]
+
+async def measure(create, article_data: ArticleCreate, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await create(article_data)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def report(name: str, samples: list[float]) -> float:
+    p50 = statistics.median(samples) * 1e3
+    print(f"{name:<20} p50={p50:8.2f}ms  max={max(samples) * 1e3:8.2f}ms")
+    return p50
+
+async def cleanup():
+    async with new_session() as session:
+        result = await session.execute(
+            delete(Articles).where(Articles.category == CATEGORY).returning(Articles.id)
+        )
+        # keep the category catalog in step, as delete_article does
+        await apply_category_deltas(session, {CATEGORY: -len(result.all())})
+        await session.commit()
+
+async def main(args):
+    await create_tables()
+    try:
+        for blocks in args.blocks:
+            article_data = make_article(blocks)
+            print(f"--- {blocks} blocks")
+
+            await measure(legacy_create, article_data, args.warmup)
+            old_p50 = report("orm unit of work", await measure(legacy_create, article_data, args.repeats))
+
+            await measure(batched_create, article_data, args.warmup)
+            new_p50 = report("insert returning", await measure(batched_create, article_data, args.repeats))
+
+            print(f"{'speedup':<20} p50=x{old_p50 / new_p50:.2f}")
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blocks", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,133 @@
+"""Auth middleware microbenchmark.
+
+Compares the previous BaseHTTPMiddleware implementation with the pure ASGI
+AuthMiddleware by driving a minimal Starlette app directly through ASGI.
+
+    python -m backend.benchmarks.middleware --requests 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from jose import jwt, JWTError
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from backend.common.middlewares import AuthMiddleware
+
+JWT_SECRET = "benchmark-secret"
+JWT_ALGORITHM = "HS256"
+
+LEGACY_EXCLUDE_PATHS = [
+    "/auth/callback",
+    "/auth/refresh",
+    "/auth/login",
+    "/docs",
+    "/openapi.json",
+]
+
+class LegacyAuthMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        path = "/" + request.url.path.split("/")[-2] + "/" + request.url.path.split("/")[-1]
+
+        if path in LEGACY_EXCLUDE_PATHS:
+            return await call_next(request)
+
+        token = request.cookies.get("access_token")
+        if not token:
+            return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+            request.state.user_id = int(payload.get("sub"))
+            request.state.role = payload.get("role")
+        except JWTError:
+            return JSONResponse(status_code=401, content={"detail": "Invalid token"})
+
+        return await call_next(request)
+
+async def endpoint(request: Request):
+    return PlainTextResponse(str(request.state.user_id))
+
+def build_app(middleware: Middleware) -> Starlette:
+    return Starlette(routes=[Route("/api/users/me", endpoint)], middleware=[middleware])
+
+def build_scope(token: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/users/me",
+        "raw_path": b"/api/users/me",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"cookie", f"access_token={token}".encode()),
+        ],
+        "client": ("127.0.0.1", 12345),
+        "server": ("127.0.0.1", 8000),
+    }
+
+async def measure(app, token: str, requests: int) -> list[float]:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"unexpected status {message['status']}")
+
+    samples = []
+    for _ in range(requests):
+        scope = build_scope(token)
+        start = time.perf_counter()
+        await app(scope, receive, send)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def report(name: str, samples: list[float]) -> tuple[float, float]:
+    quantiles = statistics.quantiles(samples, n=100)
+    p50, p99 = quantiles[49] * 1e6, quantiles[98] * 1e6
+    print(f"{name:<24} p50={p50:8.1f}us  p99={p99:8.1f}us  mean={statistics.fmean(samples) * 1e6:8.1f}us")
+    return p50, p99
+
+async def main(requests: int, warmup: int):
+    token = jwt.encode(
+        {"sub": "1", "role": "admin", "exp": time.time() + 3600},
+        JWT_SECRET,
+        algorithm=JWT_ALGORITHM,
+    )
+
+    legacy = build_app(Middleware(LegacyAuthMiddleware))
+    current = build_app(Middleware(
+        AuthMiddleware,
+        jwt_secret=JWT_SECRET,
+        jwt_algorithm=JWT_ALGORITHM,
+        exclude_paths=["/api/auth/login"],
+    ))
+
+    results = {}
+    for name, app in (("BaseHTTPMiddleware", legacy), ("pure ASGI", current)):
+        await measure(app, token, warmup)
+        results[name] = report(name, await measure(app, token, requests))
+
+    (old_p50, old_p99), (new_p50, new_p99) = results.values()
+    print(f"{'speedup':<24} p50=x{old_p50 / new_p50:.2f}  p99=x{old_p99 / new_p99:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main(args.requests, args.warmup))
@@ -0,0 +1,80 @@
+"""Per-request CPU of the default user list response vs FAST_RESPONSES.
+
+Serves a page of users (GET /api/users/) from the real router. The
+OrmDatabaseManager query is patched to return in-memory ORM rows (the
+session is still opened, it just never connects). Reports the process CPU
+time per request with FAST_RESPONSES off and on.
+
+    python -m backend.benchmarks.responses --requests 500 --users 100
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from backend.authorization import router as users_router
+from backend.authorization.database.database import Users, UserRole, UserStatus
+from backend.authorization.database.orm_db import OrmDatabaseManager as UserDbManager
+from backend.authorization.config import settings as users_settings
+
+def make_users(count: int) -> list[Users]:
+    return [
+        Users(
+            id=i, name="Иван", surname=f"Иванов{i}", patronymic="Иванович", email=f"user{i}@yourcompany.ru",
+            phone="+70000000000", telegram_link=None, post="Разработчик", team="Core",
+            role=UserRole.USER, status=UserStatus.ACTIVE, version=1,
+        )
+        for i in range(count)
+    ]
+
+def patch_queries(users: list[Users]) -> None:
+    # dependency_overrides would rebuild the override's dependant on every
+    # request and swamp the difference being measured
+    async def search_users(self, filters):
+        return users[:filters.limit], None
+
+    UserDbManager.search_users = search_users
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(users_router.user_router)
+
+    async def with_user(scope, receive, send):
+        scope.setdefault("state", {}).update(user_id=1, role="admin")
+        await app(scope, receive, send)
+
+    return with_user
+
+async def measure(client: httpx.AsyncClient, url: str, requests: int) -> float:
+    start = time.process_time()
+    for _ in range(requests):
+        resp = await client.get(url)
+        resp.raise_for_status()
+    return (time.process_time() - start) / requests
+
+async def main(args):
+    patch_queries(make_users(args.users))
+    app = make_app()
+    url = f"/api/users/?limit={args.users}"
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results = {}
+        for fast in (False, True):
+            users_settings.FAST_RESPONSES = fast
+            await measure(client, url, args.warmup)
+            results[fast] = await measure(client, url, args.requests)
+        print(
+            f"user page, {args.users:<13} default={results[False] * 1e3:7.3f}ms  "
+            f"fast={results[True] * 1e3:7.3f}ms  x{results[False] / results[True]:.2f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,129 @@
+"""OAuth login round-trip benchmark against a local stand-in Yandex server.
+
+Runs the token exchange + userinfo pair the way /api/auth/callback does, once
+with a fresh httpx.AsyncClient per call (the old behaviour) and once through the
+shared pooled client from yandex_client. Pass --certfile/--keyfile to serve the
+stand-in over TLS so handshake cost is part of the measurement.
+
+    python -m backend.benchmarks.yandex_login --logins 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import ssl
+import statistics
+import time
+
+import httpx
+
+TOKEN_BODY = json.dumps({"access_token": "stand-in-token", "token_type": "bearer"}).encode()
+USERINFO_BODY = json.dumps({"id": "1", "default_email": "user@yourcompany.ru"}).encode()
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            headers = {}
+            for line in header_lines:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length:
+                await reader.readexactly(length)
+
+            body = TOKEN_BODY if request_line.split(" ")[1].startswith("/token") else USERINFO_BODY
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: application/json\r\n"
+                b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                b"Connection: keep-alive\r\n\r\n" + body
+            )
+            await writer.drain()
+
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionResetError, ssl.SSLError):
+        pass
+    finally:
+        writer.close()
+
+async def legacy_login(code: str, token_url: str, userinfo_url: str, verify) -> dict:
+    async with httpx.AsyncClient(verify=verify) as client:
+        resp = await client.post(token_url, data={"grant_type": "authorization_code", "code": code})
+        resp.raise_for_status()
+        token = resp.json()["access_token"]
+
+    async with httpx.AsyncClient(verify=verify) as client:
+        resp = await client.get(userinfo_url, headers={"Authorization": f"OAuth {token}"})
+        resp.raise_for_status()
+        return resp.json()
+
+async def pooled_login(code: str) -> dict:
+    from backend.authorization.yandex_client import exchange_code_for_token, get_user_info
+
+    token = await exchange_code_for_token(code)
+    return await get_user_info(token)
+
+async def measure(login, logins: int, concurrency: int) -> list[float]:
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await login(f"code-{i}")
+            samples.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(logins)))
+    return samples
+
+def report(name: str, samples: list[float]) -> float:
+    quantiles = statistics.quantiles(samples, n=100)
+    p50, p99 = quantiles[49] * 1e3, quantiles[98] * 1e3
+    print(f"{name:<20} p50={p50:7.2f}ms  p99={p99:7.2f}ms  mean={statistics.fmean(samples) * 1e3:7.2f}ms")
+    return p50
+
+async def main(args):
+    ssl_context = None
+    if args.certfile:
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(args.certfile, args.keyfile)
+
+    server = await asyncio.start_server(handle_connection, "127.0.0.1", 0, ssl=ssl_context)
+    port = server.sockets[0].getsockname()[1]
+    base_url = f"{'https' if ssl_context else 'http'}://127.0.0.1:{port}"
+
+    # yandex_client reads its endpoints from settings at import time
+    os.environ["YANDEX_OAUTH_URL"] = base_url
+    os.environ["YANDEX_LOGIN_URL"] = base_url
+    from backend.authorization import yandex_client
+
+    verify = not ssl_context
+    await yandex_client.init_client(verify=verify)
+
+    async def legacy(code: str):
+        return await legacy_login(code, f"{base_url}/token", f"{base_url}/info", verify)
+
+    async with server:
+        await measure(legacy, args.warmup, args.concurrency)
+        old_p50 = report("client per call", await measure(legacy, args.logins, args.concurrency))
+
+        await measure(pooled_login, args.warmup, args.concurrency)
+        new_p50 = report("shared client", await measure(pooled_login, args.logins, args.concurrency))
+
+    await yandex_client.close_client()
+    print(f"{'speedup':<20} p50=x{old_p50 / new_p50:.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,61 @@
+from collections import deque
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+import time
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    # Times every checkout from the queue, so sessions that never run a query
+    # never take a connection just to be measured
+    metrics: "PoolMetrics"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.observe_wait(time.perf_counter() - start)
+        return conn
+
+class PoolMetrics:
+    # Connection checkout wait and pool saturation for one engine. Waits are
+    # kept in a sliding window of the last `window` checkouts.
+    def __init__(self, window: int = 1000):
+        self.engine: AsyncEngine | None = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.max_wait = 0.0
+        self._waits: deque[float] = deque(maxlen=window)
+        # a subclass per instance survives pool.recreate() on engine.dispose()
+        self.pool_class = type("TimedAsyncAdaptedQueuePool", (TimedAsyncAdaptedQueuePool,), {"metrics": self})
+
+    def attach(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+
+    def observe_wait(self, wait: float) -> None:
+        self.checkouts += 1
+        self.max_wait = max(self.max_wait, wait)
+        self._waits.append(wait)
+
+    def stats(self) -> dict:
+        pool = self.engine.pool
+        size = pool.size()
+        max_overflow = getattr(pool, "_max_overflow", 0)
+        checked_out = pool.checkedout()
+        capacity = size + max(max_overflow, 0)
+
+        waits = sorted(self._waits)
+        return {
+            "size": size,
+            "max_overflow": max_overflow,
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "saturation": checked_out / capacity if capacity else 0.0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_p50": waits[len(waits) // 2] * 1e3 if waits else 0.0,
+            "wait_ms_p99": waits[int(len(waits) * 0.99)] * 1e3 if waits else 0.0,
+            "wait_ms_max": self.max_wait * 1e3,
+        }
@@ -0,0 +1,14 @@
+from sqlalchemy import MetaData
+from sqlalchemy.engine import Connection
+
+# create_all() skips tables that already exist, and with them any index added
+# to the models later on. These helpers bring existing databases up to date.
+
+def create_missing_indexes(conn: Connection, metadata: MetaData) -> None:
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+def run_migrations(conn: Connection, statements: list[str]) -> None:
+    for statement in statements:
+        conn.exec_driver_sql(statement)
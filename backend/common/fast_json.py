@@ -0,0 +1,24 @@
+from pydantic import TypeAdapter
+from starlette.responses import Response
+from typing import Any, Mapping
+
+# Fast response path: ORM rows are validated once, from attributes, by a
+# TypeAdapter built at import time and serialized straight to bytes by
+# pydantic-core. The default path validates the response model, converts it
+# to jsonable python and runs it through the json module.
+
+def dump_json(adapter: TypeAdapter, data: Any) -> bytes:
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+def json_response(
+    adapter: TypeAdapter,
+    data: Any,
+    status_code: int = 200,
+    headers: Mapping[str, str] | None = None,
+) -> Response:
+    return Response(
+        content=dump_json(adapter, data),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
@@ -0,0 +1,26 @@
+from starlette.requests import Request
+from starlette.responses import Response
+import hashlib
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+def make_digest_etag(prefix: str, items) -> str:
+    digest = hashlib.sha1()
+    for item in items:
+        digest.update(repr(item).encode())
+        digest.update(b"\0")
+    return make_etag(prefix, digest.hexdigest())
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+import hashlib
+import heapq
+import time
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+class VerifiedTokenCache:
+    # Maps sha256(token) -> (user_id, role, exp) for tokens that already passed
+    # jwt.decode. Entries are dropped at their exp, and the least recently used
+    # ones go first when the cache is full.
+    def __init__(self, maxsize: int = 10000, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[int, str, float]] = OrderedDict()
+        self._expiries: list[tuple[float, bytes]] = []
+
+    def get(self, token: str) -> tuple[int, str] | None:
+        key = token_digest(token)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        user_id, role, exp = entry
+        if exp <= self.clock():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user_id, role
+
+    def put(self, token: str, user_id: int, role: str, exp: float) -> None:
+        if self.maxsize <= 0:
+            return
+
+        now = self.clock()
+        if exp <= now:
+            return
+
+        self._purge_expired(now)
+
+        key = token_digest(token)
+        self._entries[key] = (user_id, role, exp)
+        self._entries.move_to_end(key)
+        heapq.heappush(self._expiries, (exp, key))
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+        # LRU evictions leave stale heap items behind, rebuild once they dominate
+        if len(self._expiries) > 2 * self.maxsize:
+            self._expiries = [(exp, key) for key, (_, _, exp) in self._entries.items()]
+            heapq.heapify(self._expiries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._expiries.clear()
+
+    def _purge_expired(self, now: float) -> None:
+        while self._expiries and self._expiries[0][0] <= now:
+            exp, key = heapq.heappop(self._expiries)
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] == exp:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException, Request
+from typing import Callable
+
+_providers: dict[str, Callable[[], dict]] = {}
+
+def register_metrics(name: str, provider: Callable[[], dict]) -> None:
+    _providers[name] = provider
+
+def collect_metrics() -> dict:
+    return {name: provider() for name, provider in _providers.items()}
+
+def metrics_router(prefix: str) -> APIRouter:
+    router = APIRouter(prefix=prefix)
+
+    @router.get("/metrics")
+    async def get_metrics(request: Request):
+        if getattr(request.state, "role", None) != "admin":
+            raise HTTPException(status_code=403, detail="Forbidden: insufficient permissions")
+        return collect_metrics()
+
+    return router
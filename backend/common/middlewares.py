@@ -0,0 +1,102 @@
+from starlette.requests import cookie_parser
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from jose import jwt, JWTError
+import logging
+
+from backend.common.jwt_cache import VerifiedTokenCache
+
+logger = logging.getLogger(__name__)
+
+OPTIONS_HEADERS = {
+    "Access-Control-Allow-Methods": "GET,POST,PUT,DELETE,PATCH,OPTIONS",
+    "Access-Control-Allow-Headers": "Authorization,Content-Type",
+    "Access-Control-Allow-Credentials": "true",
+}
+
+def compile_routes(paths) -> frozenset[str]:
+    return frozenset(_normalize_path(path) for path in paths)
+
+def _normalize_path(path: str) -> str:
+    if len(path) > 1 and path.endswith("/"):
+        return path.rstrip("/") or "/"
+    return path
+
+def _get_cookie(scope: Scope, name: str) -> str | None:
+    for key, value in scope["headers"]:
+        if key == b"cookie":
+            return cookie_parser(value.decode("latin-1")).get(name)
+    return None
+
+class AuthMiddleware:
+    # user_id and role go to scope["state"], which backs request.state
+    def __init__(
+        self,
+        app: ASGIApp,
+        jwt_secret: str,
+        jwt_algorithm: str,
+        exclude_paths=(),
+        allow_origin: str = "*",
+        token_cache: VerifiedTokenCache | None = None,
+    ):
+        self.app = app
+        self.jwt_secret = jwt_secret
+        self.jwt_algorithms = [jwt_algorithm]
+        self.exclude_paths = compile_routes(exclude_paths)
+        self.options_headers = {"Access-Control-Allow-Origin": allow_origin, **OPTIONS_HEADERS}
+        self.token_cache = token_cache if token_cache is not None else VerifiedTokenCache()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or _normalize_path(scope["path"]) in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS":
+            response = JSONResponse(status_code=200, content={"message": "OK"}, headers=self.options_headers)
+            await response(scope, receive, send)
+            return
+
+        token = _get_cookie(scope, "access_token")
+
+        if not token:
+            response = JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+            await response(scope, receive, send)
+            return
+
+        try:
+            user_id, role = self.decode(token)
+        except (JWTError, TypeError, ValueError) as e:
+            logger.warning("JWT error: %s", e, extra={"method": scope["method"], "path": scope["path"]})
+
+            response = JSONResponse(status_code=401, content={"detail": "Invalid token"})
+            await response(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        state["user_id"] = user_id
+        state["role"] = role
+
+        logger.info("request", extra={"method": scope["method"], "path": scope["path"], "user_id": user_id})
+
+        await self.app(scope, receive, send)
+
+    def decode(self, token: str) -> tuple[int, str]:
+        cached = self.token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        payload = jwt.decode(token, self.jwt_secret, algorithms=self.jwt_algorithms)
+
+        sub = payload.get("sub")
+        role = payload.get("role")
+
+        if sub is None or role is None:
+            raise JWTError("Missing user_id or role in token")
+
+        user_id = int(sub)
+
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            self.token_cache.put(token, user_id, role, exp)
+
+        return user_id, role
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+from backend.knowlege.config import settings
+
+class ArticleCache:
+    # LRU of serialized ArticleRead JSON, its ETag and block count keyed by
+    # (article id, version).
+    # Readers take version() before loading from the database and store with
+    # it; invalidate() bumps the version, so a read that raced with a write
+    # can never put stale bytes back under the current version.
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[int, tuple[int, bytes, str, int]] = OrderedDict()
+        self._versions: dict[int, int] = {}
+
+    def version(self, article_id: int) -> int:
+        return self._versions.get(article_id, 0)
+
+    def get(self, article_id: int) -> tuple[bytes, str, int] | None:
+        entry = self._entries.get(article_id)
+        if entry is None or entry[0] != self.version(article_id):
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(article_id)
+        self.hits += 1
+        return entry[1], entry[2], entry[3]
+
+    def put(self, article_id: int, version: int, body: bytes, etag: str, block_count: int) -> None:
+        if self.maxsize <= 0 or version != self.version(article_id):
+            return
+
+        self._entries[article_id] = (version, body, etag, block_count)
+        self._entries.move_to_end(article_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, article_id: int) -> None:
+        self._versions[article_id] = self.version(article_id) + 1
+        self._entries.pop(article_id, None)
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "bytes": sum(len(entry[1]) for entry in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+article_cache = ArticleCache(maxsize=settings.ARTICLE_CACHE_SIZE)
@@ -9,6 +9,39 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_SEC: int = 15 * 60
     REFRESH_TOKEN_EXPIRE_SEC: int = 30 * 24 * 3600
+    JWT_CACHE_SIZE: int = 10000
+
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SEC: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE_SEC: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+
+    ARTICLE_CACHE_SIZE: int = 1000
+
+    MEDIA_ROOT: str = "media"
+    MEDIA_MAX_UPLOAD_BYTES: int = 512 * 1024 * 1024
+
+    IMAGE_VARIANT_WIDTHS: list[int] = [320, 640, 1280, 1920]
+    IMAGE_VARIANT_QUALITY: int = 80
+    IMAGE_VARIANT_WORKERS: int = 2
+    IMAGE_VARIANT_CACHE_BYTES: int = 1024 * 1024 * 1024
+    IMAGE_PLACEHOLDER_WIDTH: int = 16
+    IMAGE_PLACEHOLDER_CACHE_SIZE: int = 10000
+
+    EXPORT_BATCH_SIZE: int = 1000
+    IMPORT_CHUNK_SIZE: int = 500
+    IMPORT_SPOOL_MEMORY_BYTES: int = 16 * 1024 * 1024
+
+    SEARCH_TS_CONFIG: str = "russian"
+    SEARCH_HEADLINE_OPTIONS: str = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=25, MinWords=8"
+
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: dict[str, str] = {}
+    LOG_SAMPLE_RATES: dict[str, float] = {"backend.common.middlewares": 0.01}
+    LOG_QUEUE_SIZE: int = 10000
 
     FRONTEND_HOME: str = "http://localhost:3000/"
     # FRONTEND_HOME: str = "https://ba7a-188-214-36-34.ngrok-free.app/"
@@ -1,12 +1,19 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase, mapped_column, Mapped, relationship
-from sqlalchemy import Integer, String, Text, Enum, ForeignKey
+from sqlalchemy import Integer, String, Text, Enum, ForeignKey, Index, DateTime, func, select, update, delete, literal, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR, REGCONFIG, aggregate_order_by, insert as pg_insert
+from typing import Optional
+from datetime import datetime
 import enum
 
 from dotenv import load_dotenv
 import os
 import logging
 
+from backend.knowlege.config import settings
+from backend.common.db_metrics import PoolMetrics
+from backend.common.db_schema import create_missing_indexes, run_migrations
+
 load_dotenv()
 
 DB_HOST = os.getenv("DB_HOST")
@@ -15,22 +22,30 @@ DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 
-LOG_FILE = os.path.join("logs", "knowlege.log")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=LOG_FILE,
-)
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+pool_metrics = PoolMetrics()
+
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,
+    poolclass=pool_metrics.pool_class,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE_SEC,
+    connect_args={
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)},
+    },
 )
 
+pool_metrics.attach(engine)
+
 new_session = async_sessionmaker(
     bind=engine,
     expire_on_commit=False,
@@ -49,12 +64,25 @@ class Articles(Base):
 
     category: Mapped[str] = mapped_column(String(255), nullable=False)
 
+    # bumped by every write to the article or its blocks, drives the ETag
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+
+    # title (A) > description (B) > TEXT blocks (C), see article_search_vector()
+    search_vector: Mapped[Optional[str]] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+
     blocks: Mapped[list["ArticleBlocks"]] = relationship(
         back_populates="article",
         order_by="ArticleBlocks.position",
         cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        Index("ix_articles_category_title_id", "category", "title", "id"),
+        Index("ix_articles_title_id", "title", "id"),
+        Index("ix_articles_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
 class BlockType(enum.Enum):
     TEXT = "text"
     IMAGE = "image"
@@ -68,12 +96,110 @@ class ArticleBlocks(Base):
     block_type: Mapped[BlockType] = mapped_column(Enum(BlockType), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
     position: Mapped[int] = mapped_column(Integer, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
     article: Mapped[Articles] = relationship(back_populates="blocks")
 
+    __table_args__ = (
+        # article reading order, and keyset pages of it
+        Index("ix_article_blocks_article_position_id", "article_id", "position", "id"),
+    )
+
+class ArticleCategories(Base):
+    # Article count per category, kept in step with articles by
+    # apply_category_deltas() in the same transaction as the article write
+    __tablename__ = "article_categories"
+
+    name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    article_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+MIGRATIONS = [
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1",
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now()",
+    "ALTER TABLE article_blocks ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now()",
+    # redundant with the leading columns of ix_articles_category_title_id
+    "DROP INDEX IF EXISTS ix_articles_category_id",
+]
+
+def search_config():
+    return literal(settings.SEARCH_TS_CONFIG, REGCONFIG)
+
+def article_text_content():
+    return (
+        select(func.string_agg(ArticleBlocks.content, aggregate_order_by(literal_column("' '"), ArticleBlocks.position)))
+        .where(ArticleBlocks.article_id == Articles.id, ArticleBlocks.block_type == BlockType.TEXT)
+        .scalar_subquery()
+    )
+
+def article_search_vector():
+    def weighted(text, weight):
+        return func.setweight(
+            func.to_tsvector(search_config(), func.coalesce(text, "")),
+            literal_column(f"'{weight}'"),
+            type_=TSVECTOR,
+        )
+
+    return (
+        weighted(Articles.title, "A")
+        .op("||")(weighted(Articles.description, "B"))
+        .op("||")(weighted(article_text_content(), "C"))
+    )
+
+async def apply_category_deltas(session: AsyncSession, deltas: dict[str, int]) -> None:
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    stmt = pg_insert(ArticleCategories).values(
+        [{"name": name, "article_count": delta} for name, delta in deltas.items()]
+    )
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ArticleCategories.name],
+            set_={"article_count": ArticleCategories.article_count + stmt.excluded.article_count},
+        )
+    )
+    await session.execute(
+        delete(ArticleCategories).where(
+            ArticleCategories.name.in_(list(deltas)),
+            ArticleCategories.article_count <= 0,
+        )
+    )
+
+async def rebuild_category_counts(conn) -> None:
+    # Upserts the recount instead of DELETE + INSERT, so several workers
+    # starting at once cannot collide on the primary key; ordered by name so
+    # they take the row locks in the same order
+    stmt = pg_insert(ArticleCategories).from_select(
+        ["name", "article_count"],
+        select(Articles.category, func.count()).group_by(Articles.category).order_by(Articles.category),
+    )
+    await conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ArticleCategories.name],
+            set_={"article_count": stmt.excluded.article_count},
+        )
+    )
+    await conn.execute(
+        delete(ArticleCategories).where(
+            ~select(Articles.id).where(Articles.category == ArticleCategories.name).exists()
+        )
+    )
+
 async def create_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations, MIGRATIONS)
+        await conn.run_sync(create_missing_indexes, Base.metadata)
+        await conn.execute(
+            update(Articles)
+            .where(Articles.search_vector.is_(None))
+            .values(search_vector=article_search_vector())
+        )
+        # the counters are only maintained incrementally at runtime, recount
+        # once per start so rows written before the table existed are included
+        await rebuild_category_counts(conn)
     logger.debug("Database tables created successfully.")
 
 async def delete_tables():
@@ -1,11 +1,66 @@
-from sqlalchemy import select, delete
+from sqlalchemy import select, insert, delete, update, tuple_, func, literal_column
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from fastapi import Depends
 from typing import List
 
-from backend.knowlege.database.database import Articles, ArticleBlocks, BlockType, get_async_session
+from backend.knowlege.database.database import Articles, ArticleBlocks, ArticleCategories, BlockType, get_async_session
+from backend.knowlege.database.database import apply_category_deltas
+from backend.knowlege.database.database import article_search_vector, article_text_content, search_config
+from backend.knowlege.config import settings
+from backend.knowlege.cache import article_cache
+from backend.knowlege.media import externalize_inline_media
 from backend.knowlege.models import ArticleCreate, ArticleInfoUpdate, ArticleBlockUpdate, ArticleBlocksUpdate
+from backend.common.cursors import encode_cursor, decode_cursor
+
+BLOCK_FIELDS = ("block_type", "content", "position")
+
+def _diff_blocks(stored, incoming: List[ArticleBlockUpdate]):
+    # Pairs incoming blocks with stored rows: by id first, then by identical
+    # type and content (blocks moved around by the editor), then by position.
+    # Only changed columns of paired rows are updated, the rest is inserted or
+    # deleted.
+    unmatched = {row.id: row for row in stored}
+    pairs = []
+    pending = []
+
+    for block in incoming:
+        if block.id is not None and block.id in unmatched:
+            pairs.append((unmatched.pop(block.id), block))
+        else:
+            pending.append(block)
+
+    for key in (lambda b: (b.block_type, b.content), lambda b: b.position):
+        candidates = {}
+        for row in unmatched.values():
+            candidates.setdefault(key(row), []).append(row)
+
+        rest = []
+        for block in pending:
+            rows = candidates.get(key(block))
+            if rows:
+                row = rows.pop(0)
+                del unmatched[row.id]
+                pairs.append((row, block))
+            else:
+                rest.append(block)
+        pending = rest
+
+    updates = []
+    unchanged = 0
+    for row, block in pairs:
+        changed = {
+            field: getattr(block, field)
+            for field in BLOCK_FIELDS
+            if getattr(row, field) != getattr(block, field)
+        }
+        if changed:
+            updates.append({"id": row.id, **changed})
+        else:
+            unchanged += 1
+
+    inserts = [{field: getattr(block, field) for field in BLOCK_FIELDS} for block in pending]
+    return inserts, updates, list(unmatched), unchanged
 
 class OrmDatabaseManager:
     def __init__(self, session: AsyncSession):
@@ -14,23 +69,38 @@ class OrmDatabaseManager:
     async def create_article(
         self,
         article_data: ArticleCreate,
-    ) -> Articles:
+    ) -> dict:
+        await externalize_inline_media(article_data.blocks_data)
         try:
-            article = Articles(title=article_data.title, description=article_data.description, category=article_data.category)
-            self.session.add(article)
-
-            for block_data in article_data.blocks_data:
-                block = ArticleBlocks(
-                    block_type=BlockType(block_data.block_type),
-                    content=block_data.content,
-                    position=block_data.position,
-                    article=article,
+            article_id = await self.session.scalar(
+                insert(Articles)
+                .values(title=article_data.title, description=article_data.description, category=article_data.category)
+                .returning(Articles.id)
+            )
+
+            block_ids = []
+            if article_data.blocks_data:
+                # executemany with RETURNING is sent as multi-row INSERT ... VALUES
+                # batches; sort_by_parameter_order keeps ids aligned with blocks_data
+                result = await self.session.execute(
+                    insert(ArticleBlocks).returning(ArticleBlocks.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "article_id": article_id,
+                            "block_type": BlockType(block_data.block_type),
+                            "content": block_data.content,
+                            "position": block_data.position,
+                        }
+                        for block_data in article_data.blocks_data
+                    ],
                 )
-                self.session.add(block)
+                block_ids = list(result.scalars())
+
+            await self._touch_article(article_id, bump_version=False)
+            await apply_category_deltas(self.session, {article_data.category: 1})
 
             await self.session.commit()
-            await self.session.refresh(article)
-            return article
+            return {"id": article_id, "block_ids": block_ids}
         except Exception:
             await self.session.rollback()
             raise
@@ -45,25 +115,68 @@ class OrmDatabaseManager:
         article = result.scalars().first()
         return article
     
+    async def get_article_info(self, article_id: int) -> Articles | None:
+        result = await self.session.execute(select(Articles).where(Articles.id == article_id))
+        return result.scalars().first()
+
+    async def get_article_blocks(
+        self,
+        article_id: int,
+        limit: int,
+        cursor: str | None = None,
+    ) -> tuple[list[ArticleBlocks], str | None]:
+        # (position, id) keyset order, served by ix_article_blocks_article_position_id
+        stmt = (
+            select(ArticleBlocks)
+            .where(ArticleBlocks.article_id == article_id)
+            .order_by(ArticleBlocks.position, ArticleBlocks.id)
+            .limit(limit + 1)
+        )
+
+        if cursor:
+            position, last_id = decode_cursor(cursor, 2)
+            stmt = stmt.where(tuple_(ArticleBlocks.position, ArticleBlocks.id) > tuple_(position, last_id))
+
+        result = await self.session.execute(stmt)
+        blocks = list(result.scalars().all())
+
+        next_cursor = None
+        if len(blocks) > limit:
+            blocks = blocks[:limit]
+            next_cursor = encode_cursor(blocks[-1].position, blocks[-1].id)
+        return blocks, next_cursor
+
     async def get_articles_by_category(
         self,
         category: str,
         limit: int,
-        offset: int
-    ) -> list[Articles]:
+        offset: int,
+        cursor: str | None = None,
+    ) -> tuple[list[Articles], str | None]:
+        # (title, id) keyset order, served by ix_articles_category_title_id / ix_articles_title_id
         stmt = (
             select(Articles)
-            .where(Articles.category == category)
-            .limit(limit)
-            .offset(offset)
+            .order_by(Articles.title, Articles.id)
+            .limit(limit + 1)
         )
-        
-        if category == "all":
-            stmt = select(Articles).limit(limit).offset(offset)
+
+        if category != "all":
+            stmt = stmt.where(Articles.category == category)
+
+        if cursor:
+            title, last_id = decode_cursor(cursor, 2)
+            stmt = stmt.where(tuple_(Articles.title, Articles.id) > tuple_(title, last_id))
+        else:
+            stmt = stmt.offset(offset)
 
         result = await self.session.execute(stmt)
-        articles = result.scalars().all()
-        return articles
+        articles = list(result.scalars().all())
+
+        next_cursor = None
+        if len(articles) > limit:
+            articles = articles[:limit]
+            next_cursor = encode_cursor(articles[-1].title, articles[-1].id)
+        return articles, next_cursor
 
     async def update_article_info(self, article_id: int, data: ArticleInfoUpdate):
         stmt = select(Articles).where(Articles.id == article_id)
@@ -77,28 +190,52 @@ class OrmDatabaseManager:
             article.title = data.title
         if data.description is not None:
             article.description = data.description
-        if data.category is not None:
+        if data.category is not None and data.category != article.category:
+            await apply_category_deltas(self.session, {article.category: -1, data.category: 1})
             article.category = data.category
 
+        await self.session.flush()
+        await self._touch_article(article_id)
+
         await self.session.commit()
+        article_cache.invalidate(article_id)
         return article
 
-    async def update_article_blocks(self, article_id: int, blocks_data: List[ArticleBlockUpdate]):
-        await self.session.execute(
-            delete(ArticleBlocks).where(ArticleBlocks.article_id == article_id)
+    async def update_article_blocks(self, article_id: int, blocks_data: List[ArticleBlockUpdate]) -> dict:
+        await externalize_inline_media(blocks_data)
+        result = await self.session.execute(
+            select(ArticleBlocks.id, ArticleBlocks.block_type, ArticleBlocks.content, ArticleBlocks.position)
+            .where(ArticleBlocks.article_id == article_id)
+            .order_by(ArticleBlocks.position, ArticleBlocks.id)
         )
+        inserts, updates, deletes, unchanged = _diff_blocks(result.all(), blocks_data)
 
-        for block_data in blocks_data:
-            block = ArticleBlocks(
-                article_id=article_id,
-                block_type=block_data.block_type,
-                content=block_data.content,
-                position=block_data.position,
+        if deletes:
+            await self.session.execute(
+                delete(ArticleBlocks).where(ArticleBlocks.id.in_(deletes))
+            )
+        if updates:
+            await self.session.execute(update(ArticleBlocks), updates)
+        if inserts:
+            await self.session.execute(
+                insert(ArticleBlocks),
+                [dict(block, article_id=article_id) for block in inserts],
             )
-            self.session.add(block)
+
+        changes = {
+            "inserted": len(inserts),
+            "updated": len(updates),
+            "deleted": len(deletes),
+            "unchanged": unchanged,
+        }
+        if not (inserts or updates or deletes):
+            return changes
+
+        await self._touch_article(article_id)
 
         await self.session.commit()
-        return True
+        article_cache.invalidate(article_id)
+        return changes
 
     async def update_article_block(self, block_id: int, block_data: ArticleBlockUpdate):
         result = await self.session.execute(
@@ -109,26 +246,98 @@ class OrmDatabaseManager:
         if not block:
             raise ValueError(f"Block with id {block_id} not found")
 
+        await externalize_inline_media([block_data])
         block.block_type = block_data.block_type
         block.content = block_data.content
         block.position = block_data.position
 
+        await self.session.flush()
+        await self._touch_article(block.article_id)
+
         await self.session.commit()
+        article_cache.invalidate(block.article_id)
         return block
 
     async def delete_article(self, article_id: int) -> None:
-        stmt = delete(Articles).where(Articles.id == article_id)
-        result = await self.session.execute(stmt)
-        if result.rowcount == 0:
+        stmt = delete(Articles).where(Articles.id == article_id).returning(Articles.category)
+        category = (await self.session.execute(stmt)).scalar_one_or_none()
+        if category is None:
             raise ValueError(f"Article with id={article_id} not found")
+        await apply_category_deltas(self.session, {category: -1})
         await self.session.commit()
+        article_cache.invalidate(article_id)
 
     async def delete_article_block(self, block_id: int) -> None:
-        stmt = delete(ArticleBlocks).where(ArticleBlocks.id == block_id)
+        stmt = delete(ArticleBlocks).where(ArticleBlocks.id == block_id).returning(ArticleBlocks.article_id)
         result = await self.session.execute(stmt)
-        if result.rowcount == 0:
+        article_id = result.scalar_one_or_none()
+        if article_id is None:
             raise ValueError(f"Block with id={block_id} not found")
+
+        await self._touch_article(article_id)
         await self.session.commit()
+        article_cache.invalidate(article_id)
+
+    async def search_articles(self, query: str, limit: int, offset: int):
+        tsquery = func.websearch_to_tsquery(search_config(), query)
+        rank = func.ts_rank_cd(Articles.search_vector, tsquery)
+
+        hits = (
+            select(Articles.id, rank.label("rank"))
+            .where(Articles.search_vector.op("@@")(tsquery))
+            .order_by(rank.desc(), Articles.id)
+            .limit(limit)
+            .offset(offset)
+            .subquery()
+        )
+
+        # headlines are only built for the page of hits, not for every match
+        body = (
+            func.coalesce(Articles.description, "")
+            .op("||")(literal_column("' '"))
+            .op("||")(func.coalesce(article_text_content(), ""))
+        )
+        stmt = (
+            select(
+                Articles.id,
+                Articles.title,
+                Articles.description,
+                Articles.category,
+                hits.c.rank,
+                func.ts_headline(search_config(), Articles.title, tsquery, settings.SEARCH_HEADLINE_OPTIONS).label("title_highlight"),
+                func.ts_headline(search_config(), body, tsquery, settings.SEARCH_HEADLINE_OPTIONS).label("snippet"),
+            )
+            .join(hits, hits.c.id == Articles.id)
+            .order_by(hits.c.rank.desc(), Articles.id)
+        )
+
+        result = await self.session.execute(stmt)
+        return result.all()
+
+    async def _touch_article(self, article_id: int, bump_version: bool = True) -> None:
+        values = {"search_vector": article_search_vector()}
+        if bump_version:
+            values["version"] = Articles.version + 1
+            values["updated_at"] = func.now()
+
+        await self.session.execute(
+            update(Articles)
+            .where(Articles.id == article_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_categories(self) -> List[ArticleCategories]:
+        result = await self.session.execute(
+            select(ArticleCategories).order_by(ArticleCategories.name)
+        )
+        return list(result.scalars())
+
+    async def get_article_version(self, article_id: int) -> int | None:
+        result = await self.session.execute(
+            select(Articles.version).where(Articles.id == article_id)
+        )
+        return result.scalar_one_or_none()
 
 async def get_db_manager(session: AsyncSession = Depends(get_async_session)) -> OrmDatabaseManager:
     return OrmDatabaseManager(session)
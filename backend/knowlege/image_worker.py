@@ -0,0 +1,57 @@
+from PIL import Image, ImageOps
+import base64
+import io
+import os
+
+# Runs inside the variant process pool. Kept free of service imports so that
+# spawned workers start without loading settings or the database engine.
+
+SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "method": 4},
+    "jpeg": {"format": "JPEG", "optimize": True, "progressive": True},
+}
+
+class VariantError(Exception):
+    pass
+
+def _open(src_path: str) -> Image.Image:
+    try:
+        image = Image.open(src_path)
+    except Image.DecompressionBombError:
+        # more pixels than Image.MAX_IMAGE_PIXELS allows to decode
+        raise VariantError("Image is too large")
+    image.seek(0)
+    image = ImageOps.exif_transpose(image)
+    return image
+
+def _resize(image: Image.Image, width: int) -> Image.Image:
+    if image.width > width:
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+    return image
+
+def _prepare(image: Image.Image, fmt: str) -> Image.Image:
+    if fmt == "jpeg" and image.mode != "RGB":
+        # flatten transparency onto white instead of black
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    if fmt == "webp" and image.mode not in ("RGB", "RGBA"):
+        return image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+    return image
+
+def render_variant(src_path: str, dst_path: str, width: int, fmt: str, quality: int) -> int:
+    with _open(src_path) as image:
+        variant = _prepare(_resize(image, width), fmt)
+        tmp_path = f"{dst_path}.{os.getpid()}.tmp"
+        variant.save(tmp_path, quality=quality, **SAVE_OPTIONS[fmt])
+    os.replace(tmp_path, dst_path)
+    return os.path.getsize(dst_path)
+
+def render_placeholder(src_path: str, width: int) -> str:
+    with _open(src_path) as image:
+        placeholder = _prepare(_resize(image, width), "webp")
+        buffer = io.BytesIO()
+        placeholder.save(buffer, quality=30, **SAVE_OPTIONS["webp"])
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode()
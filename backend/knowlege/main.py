@@ -8,21 +8,33 @@ from dotenv import load_dotenv
 import os
 
 from backend.knowlege.router import router as knowledge_router
-from backend.knowlege.database.database import create_tables, delete_tables
-from backend.knowlege.middlewares import AuthMiddleware
+from backend.knowlege.database.database import create_tables, delete_tables, pool_metrics
+from backend.knowlege.middlewares import AuthMiddleware, token_cache
+from backend.knowlege.cache import article_cache
+from backend.knowlege.variants import image_variants
+from backend.knowlege.config import settings
+from backend.common.logging_setup import setup_logging, stop_logging
+from backend.common.metrics import metrics_router, register_metrics
 
 load_dotenv()
 
 LOG_FILE = os.path.join("logs", "knowlege.log")
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename=LOG_FILE,
+log_listener = setup_logging(
+    LOG_FILE,
+    level=settings.LOG_LEVEL,
+    levels=settings.LOG_LEVELS,
+    sample_rates=settings.LOG_SAMPLE_RATES,
+    queue_size=settings.LOG_QUEUE_SIZE,
 )
 
 logger = logging.getLogger(__name__)
 
+register_metrics("db_pool", pool_metrics.stats)
+register_metrics("jwt_cache", token_cache.stats)
+register_metrics("article_cache", article_cache.stats)
+register_metrics("image_variants", image_variants.stats)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up the knowledge service...")
@@ -32,11 +44,14 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Error creating knowledge service database tables: {e}")
         raise HTTPException(status_code=500, detail="Database initialization failed")
+    await image_variants.start(settings.IMAGE_VARIANT_WORKERS)
     yield
 
     # await delete_tables()
 
     logger.info("Shutting down the knowledge service...")
+    image_variants.close()
+    stop_logging(log_listener)
 
 app = FastAPI(lifespan=lifespan)
 
@@ -49,8 +64,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+app.include_router(metrics_router("/api/knowlege"))
+
 app.include_router(knowledge_router)
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, BinaryIO, Iterable
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+
+from backend.knowlege.database.database import BlockType
+from backend.knowlege.config import settings
+
+# Content-addressed media store. A file lives at
+# MEDIA_ROOT/<h[:2]>/<h[2:4]>/<h> where h is the SHA-256 of its bytes, so the
+# same upload is stored once, and a sidecar <h>.type keeps its content type.
+# Only image and video types are accepted.
+# IMAGE/VIDEO blocks keep only the "sha256:<h>" reference.
+
+MEDIA_REF_PREFIX = "sha256:"
+MEDIA_BLOCK_TYPES = (BlockType.IMAGE, BlockType.VIDEO)
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_CONTENT_TYPE_RE = re.compile(r"^(image|video)/[\w.+-]+$")
+_DATA_URI_RE = re.compile(r"^data:([\w.+-]+/[\w.+-]+)?(?:;[^,;]+)*;base64,", re.IGNORECASE)
+
+class MediaError(Exception):
+    pass
+
+class MediaTooLargeError(MediaError):
+    pass
+
+class MediaTypeError(MediaError):
+    pass
+
+def is_valid_digest(digest: str) -> bool:
+    return bool(_DIGEST_RE.match(digest))
+
+def media_ref(digest: str) -> str:
+    return MEDIA_REF_PREFIX + digest
+
+def media_path(digest: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, digest[:2], digest[2:4], digest)
+
+def normalize_content_type(content_type: str | None) -> str | None:
+    # Only image and video types are stored and served back as is. Anything
+    # else, SVG included since it can carry scripts, could turn the media URL
+    # into stored XSS.
+    if not content_type:
+        return None
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    if not _CONTENT_TYPE_RE.match(content_type) or content_type == "image/svg+xml":
+        return None
+    return content_type
+
+def is_inline_content_type(content_type: str) -> bool:
+    return content_type.startswith(("image/", "video/"))
+
+def media_content_type(digest: str) -> str:
+    try:
+        with open(media_path(digest) + ".type") as f:
+            return normalize_content_type(f.read()) or DEFAULT_CONTENT_TYPE
+    except FileNotFoundError:
+        return DEFAULT_CONTENT_TYPE
+
+def _open_upload() -> tuple[BinaryIO, str]:
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=settings.MEDIA_ROOT, prefix=".upload-")
+    return os.fdopen(fd, "wb"), tmp_path
+
+def _check_size(size: int) -> None:
+    if size > settings.MEDIA_MAX_UPLOAD_BYTES:
+        raise MediaTooLargeError(f"Media exceeds {settings.MEDIA_MAX_UPLOAD_BYTES} bytes")
+
+def _publish(tmp_path: str, hexdigest: str, content_type: str) -> None:
+    # The sidecar is in place before the blob appears under its address, so
+    # a concurrent GET never serves a new file without its type.
+    path = media_path(hexdigest)
+    if os.path.exists(path):
+        os.unlink(tmp_path)
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, type_tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".type-")
+    with os.fdopen(fd, "w") as f:
+        f.write(content_type)
+    os.replace(type_tmp_path, path + ".type")
+    os.replace(tmp_path, path)
+
+def _discard(tmp_path: str) -> None:
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+
+def _allowed_content_type(content_type: str | None) -> str:
+    normalized = normalize_content_type(content_type)
+    if normalized is None:
+        raise MediaTypeError(f"Unsupported media type: {content_type or 'none'}")
+    return normalized
+
+def _store(chunks: Iterable[bytes], content_type: str | None) -> tuple[str, int]:
+    content_type = _allowed_content_type(content_type)
+    digest = hashlib.sha256()
+    size = 0
+
+    tmp, tmp_path = _open_upload()
+    try:
+        with tmp:
+            for chunk in chunks:
+                size += len(chunk)
+                _check_size(size)
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        hexdigest = digest.hexdigest()
+        _publish(tmp_path, hexdigest, content_type)
+        return hexdigest, size
+    except BaseException:
+        _discard(tmp_path)
+        raise
+
+async def save_stream(chunks: AsyncIterator[bytes], content_type: str | None) -> tuple[str, int]:
+    # Hashes and writes the request body as it arrives, so an oversized upload
+    # is cut off at the limit instead of being spooled first.
+    content_type = _allowed_content_type(content_type)
+    digest = hashlib.sha256()
+    size = 0
+
+    tmp, tmp_path = await run_in_threadpool(_open_upload)
+    try:
+        with tmp:
+            async for chunk in chunks:
+                size += len(chunk)
+                _check_size(size)
+                digest.update(chunk)
+                await run_in_threadpool(tmp.write, chunk)
+
+        hexdigest = digest.hexdigest()
+        await run_in_threadpool(_publish, tmp_path, hexdigest, content_type)
+        return hexdigest, size
+    except BaseException:
+        await run_in_threadpool(_discard, tmp_path)
+        raise
+
+async def save_bytes(data: bytes, content_type: str | None) -> tuple[str, int]:
+    return await run_in_threadpool(_store, [data], content_type)
+
+async def externalize_inline_media(blocks) -> None:
+    # Moves base64 data URIs of IMAGE/VIDEO blocks into the store and leaves a
+    # reference in their content instead.
+    for block in blocks:
+        if block.block_type not in MEDIA_BLOCK_TYPES:
+            continue
+        match = _DATA_URI_RE.match(block.content)
+        if not match:
+            continue
+        try:
+            data = base64.b64decode(block.content[match.end():], validate=True)
+        except binascii.Error:
+            raise MediaError("Invalid base64 media content")
+        digest, _ = await save_bytes(data, match.group(1))
+        block.content = media_ref(digest)
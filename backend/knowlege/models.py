@@ -41,12 +41,32 @@ class ArticleShortRead(BaseModel):
     class Config:
         from_attributes = True
 
+class ArticleSearchHit(BaseModel):
+    id: int
+    title: str
+    description: Optional[str]
+    category: str
+    rank: float
+    title_highlight: str
+    snippet: str
+
+    class Config:
+        from_attributes = True
+
+class CategoryRead(BaseModel):
+    name: str
+    article_count: int
+
+    class Config:
+        from_attributes = True
+
 class ArticleInfoUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     category: Optional[str] = None
 
 class ArticleBlockUpdate(BaseModel):
+    id: Optional[int] = None
     block_type: BlockType
     content: str
     position: int
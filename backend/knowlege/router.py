@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse, FileResponse
+from typing import List, Optional
+import os
 from sqlalchemy.exc import SQLAlchemyError
 
 from backend.knowlege.database.orm_db import OrmDatabaseManager, get_db_manager
-from backend.knowlege.models import ArticleCreate, ArticleRead, ArticleBlockRead, ArticleShortRead, ArticleInfoUpdate
+from backend.knowlege.models import ArticleCreate, ArticleRead, ArticleBlockRead, ArticleShortRead, ArticleInfoUpdate, ArticleSearchHit
+from backend.knowlege.models import CategoryRead
 from backend.knowlege.models import ArticleBlocksUpdate, ArticleBlockUpdate
 from backend.knowlege.utils import get_current_user, validate_user_role
+from backend.knowlege.cache import article_cache
+from backend.knowlege.transfer import export_articles, import_articles, stream_article, spool_body, read_spooled
+from backend.knowlege.media import MediaError, MediaTooLargeError, MediaTypeError, save_stream, is_valid_digest, media_ref, media_path
+from backend.knowlege.media import media_content_type, is_inline_content_type
+from backend.knowlege.variants import VARIANT_FORMATS, VariantError, image_variants
+from backend.knowlege.config import settings
+from backend.common.http_cache import make_etag, make_digest_etag, etag_matches, not_modified
 
 router = APIRouter(
     prefix="/api/knowlege"
@@ -26,13 +36,219 @@ async def create_article_endpoint(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/search", response_model=List[ArticleSearchHit])
+async def search_articles_endpoint(
+    q: str = Query(..., min_length=1, description="Поисковый запрос"),
+    limit: int = Query(10, ge=1, le=100, description="Сколько статей вернуть"),
+    offset: int = Query(0, ge=0, description="Сдвиг для пагинации"),
+    user_info: dict = Depends(get_current_user),
+    db_manager: OrmDatabaseManager = Depends(get_db_manager),
+):
+    validate_user_role(user_info)
+    try:
+        hits = await db_manager.search_articles(q, limit=limit, offset=offset)
+        return [ArticleSearchHit.model_validate(hit) for hit in hits]
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error")
+
+@router.get("/categories", response_model=List[CategoryRead])
+async def get_categories_endpoint(
+    request: Request,
+    response: Response,
+    user_info: dict = Depends(get_current_user),
+    db_manager: OrmDatabaseManager = Depends(get_db_manager),
+):
+    validate_user_role(user_info)
+    try:
+        categories = await db_manager.get_categories()
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error")
+
+    etag = make_digest_etag("categories", ((c.name, c.article_count) for c in categories))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    return [CategoryRead.model_validate(category) for category in categories]
+
+@router.post("/media", status_code=status.HTTP_201_CREATED)
+async def upload_media_endpoint(
+    request: Request,
+    user_info: dict = Depends(get_current_user),
+):
+    # The body is the file itself and Content-Type its media type
+    validate_user_role(user_info, ["admin", "editor"])
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.MEDIA_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Media exceeds {settings.MEDIA_MAX_UPLOAD_BYTES} bytes")
+
+    try:
+        digest, size = await save_stream(request.stream(), request.headers.get("content-type"))
+    except MediaTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MediaTypeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    return {
+        "ok": True,
+        "ref": media_ref(digest),
+        "url": f"{router.prefix}/media/{digest}",
+        "size": size,
+        "content_type": media_content_type(digest),
+    }
+
+@router.get("/media/{digest}")
+async def get_media_endpoint(
+    digest: str,
+    request: Request,
+    user_info: dict = Depends(get_current_user),
+):
+    validate_user_role(user_info)
+    if not is_valid_digest(digest):
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    # the content never changes under its address, so the hash is the ETag
+    etag = make_etag(digest)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    path = media_path(digest)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    content_type = media_content_type(digest)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "X-Content-Type-Options": "nosniff",
+    }
+    if not is_inline_content_type(content_type):
+        headers["Content-Disposition"] = "attachment"
+
+    # FileResponse answers Range requests and hands the file to the server
+    # through the pathsend extension when it is available
+    return FileResponse(path, media_type=content_type, headers=headers)
+
+def _variant_url(digest: str, width: int) -> str:
+    return f"{router.prefix}/media/{digest}/variant?w={width}"
+
+@router.get("/media/{digest}/variants")
+async def get_media_variants_endpoint(
+    digest: str,
+    user_info: dict = Depends(get_current_user),
+):
+    validate_user_role(user_info)
+    if not is_valid_digest(digest):
+        raise HTTPException(status_code=404, detail="Media not found")
+    try:
+        placeholder = await image_variants.get_placeholder(digest)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Media not found")
+    except VariantError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    widths = image_variants.widths
+    return {
+        "placeholder": placeholder,
+        "src": _variant_url(digest, widths[-1]),
+        "srcset": ", ".join(f"{_variant_url(digest, width)} {width}w" for width in widths),
+        "widths": widths,
+    }
+
+@router.get("/media/{digest}/variant")
+async def get_media_variant_endpoint(
+    digest: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, description="Нужная ширина, округляется вверх до ближайшего размера"),
+    format: Optional[str] = Query(None, description="webp или jpeg, по умолчанию по заголовку Accept"),
+    user_info: dict = Depends(get_current_user),
+):
+    validate_user_role(user_info)
+    if not is_valid_digest(digest):
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    headers = {"Cache-Control": "private, max-age=31536000, immutable"}
+    if format is None:
+        format = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+        headers["Vary"] = "Accept"
+    elif format not in VARIANT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported format")
+
+    # a deleted or unknown digest must not be answered with 304
+    if not os.path.isfile(media_path(digest)):
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    width = image_variants.bucket(w)
+    etag = make_etag(digest, width, format)
+    headers["ETag"] = etag
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        path, _ = await image_variants.get_variant(digest, width, format)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Media not found")
+    except VariantError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    return FileResponse(path, media_type=f"image/{format}", headers=headers)
+
+# Both streams open their own session: dependency sessions are closed before
+# a StreamingResponse body starts running.
+@router.get("/export")
+async def export_articles_endpoint(
+    user_info: dict = Depends(get_current_user),
+):
+    validate_user_role(user_info, ["admin", "editor"])
+    return StreamingResponse(
+        export_articles(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="knowlege.ndjson"'},
+    )
+
+@router.post("/import")
+async def import_articles_endpoint(
+    request: Request,
+    user_info: dict = Depends(get_current_user),
+):
+    validate_user_role(user_info, ["admin", "editor"])
+    body = await spool_body(request.stream())
+    return StreamingResponse(import_articles(read_spooled(body)), media_type="application/x-ndjson")
+
 @router.get("/{article_id}", response_model=ArticleRead)
 async def get_article_endpoint(
     article_id: int,
+    request: Request,
+    blocks_limit: Optional[int] = Query(None, ge=1, le=1000, description="Статья, в которой больше блоков, возвращается с первыми blocks_limit, остальные по X-Next-Cursor через /{article_id}/blocks"),
     user_info: dict = Depends(get_current_user),
     db_manager: OrmDatabaseManager = Depends(get_db_manager),
 ):
     validate_user_role(user_info)
+
+    cached = article_cache.get(article_id)
+    if cached is not None:
+        body, etag, block_count = cached
+        if blocks_limit is None or block_count <= blocks_limit:
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+    version = article_cache.version(article_id)
+    try:
+        if request.headers.get("if-none-match"):
+            article_version = await db_manager.get_article_version(article_id)
+            if article_version is not None:
+                etags = [make_etag("article", article_id, article_version)]
+                if blocks_limit is not None:
+                    etags.append(make_etag("article", article_id, article_version, "head", blocks_limit))
+                for etag in etags:
+                    if etag_matches(request, etag):
+                        return not_modified(etag)
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error")
+
+    if blocks_limit is not None:
+        return await _get_article_head(article_id, blocks_limit, version, db_manager)
+
     try:
         article = await db_manager.get_article_by_id(article_id)
         if not article:
@@ -53,28 +269,107 @@ async def get_article_endpoint(
                 for block in article.blocks
             ]
         )
-        return article_data
+        body = article_data.model_dump_json().encode()
+        etag = make_etag("article", article.id, article.version)
+        article_cache.put(article_id, version, body, etag, len(article.blocks))
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Database error")
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+async def _get_article_head(article_id: int, blocks_limit: int, version: int, db_manager: OrmDatabaseManager) -> Response:
+    # An article that fits into blocks_limit is the full article: it gets the
+    # same ETag and goes into the cache. Only longer ones are cut, with the
+    # rest available from /{article_id}/blocks via X-Next-Cursor.
+    try:
+        article = await db_manager.get_article_info(article_id)
+        if not article:
+            raise HTTPException(status_code=404, detail="Article not found")
+        blocks, next_cursor = await db_manager.get_article_blocks(article_id, blocks_limit)
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error")
+
+    article_data = ArticleRead(
+        id=article.id,
+        title=article.title,
+        description=article.description,
+        category=article.category,
+        blocks_data=[ArticleBlockRead.model_validate(block) for block in blocks],
+    )
+    body = article_data.model_dump_json().encode()
+
+    if next_cursor is None:
+        etag = make_etag("article", article.id, article.version)
+        article_cache.put(article_id, version, body, etag, len(blocks))
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+    etag = make_etag("article", article.id, article.version, "head", blocks_limit)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "X-Next-Cursor": next_cursor})
+
+@router.get("/{article_id}/blocks", response_model=List[ArticleBlockRead])
+async def get_article_blocks_endpoint(
+    article_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000, description="Сколько блоков вернуть"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы из заголовка X-Next-Cursor"),
+    user_info: dict = Depends(get_current_user),
+    db_manager: OrmDatabaseManager = Depends(get_db_manager),
+):
+    validate_user_role(user_info)
+    try:
+        blocks, next_cursor = await db_manager.get_article_blocks(article_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [ArticleBlockRead.model_validate(block) for block in blocks]
+
+@router.get("/{article_id}/stream")
+async def stream_article_endpoint(
+    article_id: int,
+    user_info: dict = Depends(get_current_user),
+    db_manager: OrmDatabaseManager = Depends(get_db_manager),
+):
+    validate_user_role(user_info)
+    try:
+        if await db_manager.get_article_version(article_id) is None:
+            raise HTTPException(status_code=404, detail="Article not found")
+    except SQLAlchemyError:
+        raise HTTPException(status_code=500, detail="Database error")
+
+    return StreamingResponse(stream_article(article_id), media_type="application/x-ndjson")
+
 @router.get("", response_model=List[ArticleShortRead])
 async def get_articles_by_category_endpoint(
     category: str = Query(..., description="Название категории"),
     limit: int = Query(10, ge=1, le=100, description="Сколько статей вернуть"),
     offset: int = Query(0, ge=0, description="Сдвиг для пагинации"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы из заголовка X-Next-Cursor"),
+    request: Request = None,
+    response: Response = None,
     user_info: dict = Depends(get_current_user),
     db_manager: OrmDatabaseManager = Depends(get_db_manager),
 ):
     validate_user_role(user_info)
     try:
-        articles = await db_manager.get_articles_by_category(
+        articles, next_cursor = await db_manager.get_articles_by_category(
             category=category,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor,
         )
+        etag = make_digest_etag("articles", [(a.id, a.version) for a in articles] + [next_cursor])
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        response.headers["ETag"] = etag
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
 
         return [
             ArticleShortRead(
@@ -117,8 +412,8 @@ async def update_article_blocks_endpoint(
 ):
     validate_user_role(user_info, ["admin", "editor"])
     try:
-        await db_manager.update_article_blocks(article_id, blocks_update.blocks_data)
-        return {"ok": True, "article_id": article_id}
+        changes = await db_manager.update_article_blocks(article_id, blocks_update.blocks_data)
+        return {"ok": True, "article_id": article_id, "changes": changes}
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail="Database error")
     except Exception as e:
@@ -145,6 +440,8 @@ async def update_article_block_endpoint(
         }
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except MediaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))  
 
@@ -0,0 +1,214 @@
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from pydantic import ValidationError
+from typing import AsyncIterator, BinaryIO
+from starlette.concurrency import run_in_threadpool
+from tempfile import SpooledTemporaryFile
+import json
+import logging
+import time
+
+from backend.knowlege.database.database import Articles, ArticleBlocks, BlockType, new_session, article_search_vector
+from backend.knowlege.database.database import apply_category_deltas
+from collections import Counter
+from backend.knowlege.models import ArticleCreate
+from backend.knowlege.media import MediaError, externalize_inline_media
+from backend.knowlege.config import settings
+
+logger = logging.getLogger(__name__)
+
+# NDJSON backup format: one article per line, the same shape ArticleCreate
+# accepts plus the source id, so an export can be fed straight into an import.
+
+def _dump(obj: dict) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+async def export_articles(batch_size: int = settings.EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    # Rows come from a server-side cursor ordered by article, so only the
+    # article currently being assembled is held in memory.
+    stmt = (
+        select(
+            Articles.id, Articles.title, Articles.description, Articles.category,
+            ArticleBlocks.block_type, ArticleBlocks.content, ArticleBlocks.position,
+        )
+        .outerjoin(ArticleBlocks, ArticleBlocks.article_id == Articles.id)
+        .order_by(Articles.id, ArticleBlocks.position, ArticleBlocks.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    async with new_session() as session:
+        result = await session.stream(stmt)
+        article = None
+        async for rows in result.partitions():
+            for row in rows:
+                if article is None or article["id"] != row.id:
+                    if article is not None:
+                        yield _dump(article)
+                    article = {
+                        "id": row.id,
+                        "title": row.title,
+                        "description": row.description,
+                        "category": row.category,
+                        "blocks_data": [],
+                    }
+                if row.block_type is not None:
+                    article["blocks_data"].append({
+                        "block_type": row.block_type.value,
+                        "content": row.content,
+                        "position": row.position,
+                    })
+        if article is not None:
+            yield _dump(article)
+
+async def stream_article(article_id: int, batch_size: int = settings.EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    # The metadata line first, then one line per block in reading order, so
+    # the client can render while the rest is still on its way.
+    async with new_session() as session:
+        article = (await session.execute(
+            select(Articles.id, Articles.title, Articles.description, Articles.category, Articles.version)
+            .where(Articles.id == article_id)
+        )).first()
+        if article is None:
+            return
+        yield _dump(dict(article._mapping))
+
+        result = await session.stream(
+            select(ArticleBlocks.id, ArticleBlocks.block_type, ArticleBlocks.content, ArticleBlocks.position)
+            .where(ArticleBlocks.article_id == article_id)
+            .order_by(ArticleBlocks.position, ArticleBlocks.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for rows in result.partitions():
+            for row in rows:
+                yield _dump({
+                    "id": row.id,
+                    "block_type": row.block_type.value,
+                    "content": row.content,
+                    "position": row.position,
+                })
+
+async def spool_body(chunks: AsyncIterator[bytes]) -> BinaryIO:
+    # The request body has to be read completely before the StreamingResponse
+    # starts: once it runs, the server's disconnect listener consumes the
+    # remaining body messages and those lines would be silently lost.
+    file = SpooledTemporaryFile(max_size=settings.IMPORT_SPOOL_MEMORY_BYTES)
+    try:
+        async for chunk in chunks:
+            await run_in_threadpool(file.write, chunk)
+        file.seek(0)
+    except BaseException:
+        file.close()
+        raise
+    return file
+
+async def read_spooled(file: BinaryIO, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    try:
+        while chunk := await run_in_threadpool(file.read, chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+async def _read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+async def _insert_chunk(articles: list[ArticleCreate]) -> None:
+    for article in articles:
+        await externalize_inline_media(article.blocks_data)
+
+    async with new_session() as session:
+        async with session.begin():
+            result = await session.execute(
+                insert(Articles).returning(Articles.id, sort_by_parameter_order=True),
+                [
+                    {"title": article.title, "description": article.description, "category": article.category}
+                    for article in articles
+                ],
+            )
+            article_ids = list(result.scalars())
+
+            blocks = [
+                {
+                    "article_id": article_id,
+                    "block_type": BlockType(block.block_type),
+                    "content": block.content,
+                    "position": block.position,
+                }
+                for article_id, article in zip(article_ids, articles)
+                for block in article.blocks_data
+            ]
+            if blocks:
+                await session.execute(insert(ArticleBlocks), blocks)
+
+            await session.execute(
+                update(Articles)
+                .where(Articles.id.in_(article_ids))
+                .values(search_vector=article_search_vector())
+                .execution_options(synchronize_session=False)
+            )
+            await apply_category_deltas(session, Counter(article.category for article in articles))
+
+async def import_articles(chunks: AsyncIterator[bytes], chunk_size: int = settings.IMPORT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    # Each chunk is committed in its own transaction: a failing chunk is
+    # reported and skipped, the ones before it stay imported. Progress is
+    # streamed back as NDJSON after every chunk.
+    start = time.perf_counter()
+    imported = 0
+    failed = 0
+    line_no = 0
+    pending: list[ArticleCreate] = []
+    first_line = 1
+
+    async def flush():
+        nonlocal imported, failed
+        try:
+            await _insert_chunk(pending)
+            imported += len(pending)
+            return None
+        except SQLAlchemyError as e:
+            logger.error(f"Import of lines {first_line}-{line_no} failed: {e}")
+            failed += len(pending)
+            return {"lines": [first_line, line_no], "error": "Database error"}
+        except MediaError as e:
+            failed += len(pending)
+            return {"lines": [first_line, line_no], "error": str(e)}
+
+    def progress():
+        return {
+            "imported": imported,
+            "failed": failed,
+            "lines": line_no,
+            "elapsed_sec": round(time.perf_counter() - start, 3),
+        }
+
+    async for line in _read_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            pending.append(ArticleCreate.model_validate_json(line))
+        except ValidationError as e:
+            failed += 1
+            yield _dump({"line": line_no, "error": e.errors(include_url=False, include_context=False, include_input=False)})
+            continue
+
+        if len(pending) >= chunk_size:
+            error = await flush()
+            if error:
+                yield _dump(error)
+            pending = []
+            first_line = line_no + 1
+            yield _dump(progress())
+
+    if pending:
+        error = await flush()
+        if error:
+            yield _dump(error)
+
+    yield _dump({"done": True, **progress()})
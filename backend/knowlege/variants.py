@@ -0,0 +1,194 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import logging
+import multiprocessing
+import os
+
+from backend.knowlege.image_worker import VariantError, render_variant, render_placeholder
+from backend.knowlege.media import media_path, media_content_type
+from backend.knowlege.config import settings
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = ("webp", "jpeg")
+
+class VariantDiskCache:
+    # LRU over variant files on disk, bounded by their total size. The index
+    # is rebuilt from the directory (oldest mtime first) on startup.
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._files: OrderedDict[str, int] = OrderedDict()
+
+    def load(self) -> None:
+        files = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.endswith(".tmp"):
+                    os.unlink(path)
+                    continue
+                stat = os.stat(path)
+                files.append((stat.st_mtime, path, stat.st_size))
+
+        self._files.clear()
+        self.total_bytes = 0
+        for _, path, size in sorted(files):
+            self._files[path] = size
+            self.total_bytes += size
+        self._evict()
+
+    def get(self, path: str) -> bool:
+        if path not in self._files:
+            self.misses += 1
+            return False
+        self._files.move_to_end(path)
+        self.hits += 1
+        return True
+
+    def add(self, path: str, size: int) -> None:
+        self.total_bytes += size - self._files.pop(path, 0)
+        self._files[path] = size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and len(self._files) > 1:
+            path, size = self._files.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "files": len(self._files),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+class ImageVariants:
+    # Width-bucketed WebP/JPEG derivatives of stored images, rendered in a
+    # process pool. Concurrent requests for the same variant share one render.
+    def __init__(self, root: str, widths: list[int], quality: int, placeholder_width: int, max_bytes: int):
+        self.root = root
+        self.widths = sorted(widths)
+        self.quality = quality
+        self.placeholder_width = placeholder_width
+        self.cache = VariantDiskCache(root, max_bytes)
+        self._pool: ProcessPoolExecutor | None = None
+        self._pending: dict[str, asyncio.Future] = {}
+        self._placeholders: OrderedDict[str, str] = OrderedDict()
+
+    async def start(self, workers: int) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        await run_in_threadpool(self.cache.load)
+        # spawn, not fork: the service process runs an event loop and threads
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def bucket(self, width: int | None) -> int:
+        if width is None:
+            return self.widths[-1]
+        for bucket in self.widths:
+            if bucket >= width:
+                return bucket
+        return self.widths[-1]
+
+    def variant_path(self, digest: str, width: int, fmt: str) -> str:
+        return os.path.join(self.root, digest[:2], digest, f"{width}.{fmt}")
+
+    def _source(self, digest: str) -> str:
+        path = media_path(digest)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(digest)
+        if not media_content_type(digest).startswith("image/"):
+            raise VariantError("Media is not an image")
+        return path
+
+    async def _run(self, func, *args):
+        if self._pool is None:
+            raise RuntimeError("Image variant pool is not started")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+        except (OSError, ValueError) as e:
+            # Pillow raises these for unreadable or unsupported images; the
+            # worker raises VariantError itself for decompression bombs
+            logger.warning(f"Image variant rendering failed: {e}")
+            raise VariantError("Unsupported image")
+
+    async def _shared(self, key: str, make):
+        future = self._pending.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(make())
+        self._pending[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._pending.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    async def get_variant(self, digest: str, width: int | None, fmt: str) -> tuple[str, int]:
+        width = self.bucket(width)
+        path = self.variant_path(digest, width, fmt)
+        if self.cache.get(path) and os.path.isfile(path):
+            return path, width
+
+        async def make():
+            source = self._source(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            size = await self._run(render_variant, source, path, width, fmt, self.quality)
+            self.cache.add(path, size)
+            return path
+
+        return await self._shared(path, make), width
+
+    async def get_placeholder(self, digest: str) -> str:
+        placeholder = self._placeholders.get(digest)
+        if placeholder is not None:
+            self._placeholders.move_to_end(digest)
+            return placeholder
+
+        async def make():
+            return await self._run(render_placeholder, self._source(digest), self.placeholder_width)
+
+        placeholder = await self._shared(f"placeholder:{digest}", make)
+        self._placeholders[digest] = placeholder
+        while len(self._placeholders) > settings.IMAGE_PLACEHOLDER_CACHE_SIZE:
+            self._placeholders.popitem(last=False)
+        return placeholder
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "placeholders": len(self._placeholders),
+            "rendering": len(self._pending),
+        }
+
+image_variants = ImageVariants(
+    root=os.path.join(settings.MEDIA_ROOT, "variants"),
+    widths=settings.IMAGE_VARIANT_WIDTHS,
+    quality=settings.IMAGE_VARIANT_QUALITY,
+    placeholder_width=settings.IMAGE_PLACEHOLDER_WIDTH,
+    max_bytes=settings.IMAGE_VARIANT_CACHE_BYTES,
+)
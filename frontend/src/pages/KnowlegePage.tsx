@@ -25,10 +25,14 @@ export interface ArticleShortRead {
   description?: string;
 }
 
-const categories = ["Все", "к1", "к2"];
+export interface CategoryRead {
+  name: string;
+  article_count: number;
+}
 
 export const KnowledgePage: React.FC = () => {
   const [user, setUser] = useState<UserRead | null>(null);
+  const [categories, setCategories] = useState<string[]>(["Все"]);
   const [articles, setArticles] = useState<ArticleShortRead[]>([]);
   const [selectedCategory, setSelectedCategory] = useState<string>("Все");
   const [offset, setOffset] = useState<number>(0);
@@ -46,6 +50,16 @@ export const KnowledgePage: React.FC = () => {
     }
   };
 
+  const fetchCategories = async () => {
+    try {
+      const res = await client.get("/api/knowlege/categories");
+      const data: CategoryRead[] = res.data;
+      setCategories(["Все", ...data.map((c) => c.name)]);
+    } catch (error) {
+      console.error(error);
+    }
+  };
+
   const fetchArticles = async (
     category: string,
     offsetValue: number,
@@ -82,6 +96,7 @@ export const KnowledgePage: React.FC = () => {
 
   useEffect(() => {
     fetchUser();
+    fetchCategories();
     fetchArticles("Все", 0);
   }, []);
 
@@ -24,6 +24,34 @@ interface Article {
   blocks_data: ArticleBlock[];
 }
 
+// articles up to this many blocks come whole (and cached by the server),
+// longer ones are cut and the rest is loaded page by page
+const ARTICLE_HEAD_BLOCKS = 200;
+const BLOCKS_PAGE_SIZE = 50;
+
+// IMAGE/VIDEO blocks may hold a "sha256:<hash>" reference to the media store
+const mediaSrc = (content: string) =>
+  content.startsWith("sha256:")
+    ? `${client.get_knowledge_base_url()}/api/knowlege/media/${content.slice(7)}`
+    : content;
+
+// widest the article column gets (max-w-4xl)
+const ARTICLE_WIDTH = 896;
+
+interface MediaVariants {
+  placeholder: string;
+  src: string;
+  srcset: string;
+  widths: number[];
+}
+
+// variant URLs from the server are relative to the knowledge service
+const absoluteSrcSet = (srcset: string) =>
+  srcset
+    .split(", ")
+    .map((entry) => `${client.get_knowledge_base_url()}${entry}`)
+    .join(", ");
+
 export const ArticleViewPage: React.FC = () => {
     const { article_id } = useParams<{ article_id: string }>();
     const navigate = useNavigate();
@@ -37,12 +65,29 @@ export const ArticleViewPage: React.FC = () => {
   
       const loadData = async () => {
         try {
+          // for long articles the rest of the blocks is loaded after the
+          // first render
           const [userRes, articleRes] = await Promise.all([
             client.get("/api/users/me"),
-            client.get(`/api/knowlege/${article_id}`),
+            client.get(`/api/knowlege/${article_id}`, {
+              params: { blocks_limit: ARTICLE_HEAD_BLOCKS },
+            }),
           ]);
           setUser(userRes.data);
           setArticle(articleRes.data);
+          setLoading(false);
+
+          let cursor = articleRes.headers["x-next-cursor"];
+          while (cursor) {
+            const blocksRes = await client.get(`/api/knowlege/${article_id}/blocks`, {
+              params: { limit: BLOCKS_PAGE_SIZE, cursor },
+            });
+            const blocks: ArticleBlock[] = blocksRes.data;
+            setArticle((prev) =>
+              prev ? { ...prev, blocks_data: [...prev.blocks_data, ...blocks] } : prev
+            );
+            cursor = blocksRes.headers["x-next-cursor"];
+          }
         } catch (err) {
           toast.error("Ошибка при загрузке статьи");
           console.error(err);
@@ -123,11 +168,7 @@ const ArticleBlock: React.FC<{ block: ArticleBlock }> = ({ block }) => {
       case "image":
         return (
           <div className="my-4">
-            <img
-              src={block.content}
-              alt=""
-              className="max-w-full h-auto rounded shadow"
-            />
+            <ArticleImage content={block.content} />
           </div>
         );
   
@@ -135,7 +176,7 @@ const ArticleBlock: React.FC<{ block: ArticleBlock }> = ({ block }) => {
         return (
           <div className="my-4">
             <video
-              src={block.content}
+              src={mediaSrc(block.content)}
               controls
               className="max-w-full h-auto rounded shadow"
             />
@@ -148,4 +189,59 @@ const ArticleBlock: React.FC<{ block: ArticleBlock }> = ({ block }) => {
   };
   
 
+// Stored images are served as resized variants: the srcset and the blurred
+// placeholder shown until the image loads come from /media/{hash}/variants.
+const ArticleImage: React.FC<{ content: string }> = ({ content }) => {
+  const [variants, setVariants] = useState<MediaVariants | null>(null);
+  const [failed, setFailed] = useState(false);
+  const [loaded, setLoaded] = useState(false);
+
+  useEffect(() => {
+    if (!content.startsWith("sha256:")) return;
+    let cancelled = false;
+    client
+      .get(`/api/knowlege/media/${content.slice(7)}/variants`)
+      .then((res) => {
+        if (!cancelled) setVariants(res.data);
+      })
+      .catch((err) => {
+        console.error(err);
+        if (!cancelled) setFailed(true);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [content]);
+
+  if (!content.startsWith("sha256:") || failed) {
+    return <img src={mediaSrc(content)} loading="lazy" alt="" className="max-w-full h-auto rounded shadow" />;
+  }
+
+  if (!variants) {
+    return <div className="w-full aspect-video rounded bg-gray-100" />;
+  }
+
+  const largest = variants.widths[variants.widths.length - 1];
+  return (
+    <img
+      src={`${client.get_knowledge_base_url()}${variants.src}`}
+      srcSet={absoluteSrcSet(variants.srcset)}
+      sizes={`(max-width: ${ARTICLE_WIDTH}px) 100vw, ${Math.min(ARTICLE_WIDTH, largest)}px`}
+      loading="lazy"
+      alt=""
+      onLoad={() => setLoaded(true)}
+      style={
+        loaded
+          ? undefined
+          : {
+              backgroundImage: `url(${variants.placeholder})`,
+              backgroundSize: "cover",
+              filter: "blur(8px)",
+            }
+      }
+      className="max-w-full h-auto rounded shadow"
+    />
+  );
+};
+
 export default ArticleViewPage
\ No newline at end of file